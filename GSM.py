@@ -1,18 +1,38 @@
 '''GSM.py - Game State Manager(manage game states transitions)'''
+import time
 import pygame
 import control
 import design
+import engine
 import gameplay
 import menu
+import replay
 from constants import *
 
+# Window events after which the screen has to be repainted
+REDRAW_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED)
+
+def hover_key(rects, pos):
+    """Which of rects contain pos, for hover change detection"""
+    return tuple(bool(rect and rect.collidepoint(pos)) for rect in rects)
+
 class GameState:
     """Base class for all game states."""
+    # Set when the screen is out of date; states that redraw every frame ignore it
+    dirty = True
+
     def update(self, events, delta_time):
         pass
     
     def draw(self, screen):
         pass
+
+    def redraw_timeout(self):
+        """Milliseconds the main loop may sleep waiting for input before this state has to be drawn.
+
+        0 keeps the loop running every frame; None means only input changes the screen.
+        """
+        return 0
     
     def on_enter(self):
         pass
@@ -26,9 +46,14 @@ class MenuState(GameState):
         self.current_level_index = 0
         self.play_button = None
         self.level_button = None
+        self.hover = None
 
     def update(self, events, delta_time):
         for event in events:
+            if event.type in REDRAW_EVENTS:
+                self.dirty = True
+            elif event.type == pygame.MOUSEMOTION:
+                self.dirty |= hover_key((self.play_button, self.level_button), event.pos) != self.hover
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if self.play_button and self.play_button.collidepoint(event.pos):
                     menu.current_level_index = self.current_level_index
@@ -37,23 +62,86 @@ class MenuState(GameState):
                 elif self.level_button and self.level_button.collidepoint(event.pos):
                     self.current_level_index = (self.current_level_index + 1) % len(LEVEL_OPTIONS)
                     menu.current_level_index = self.current_level_index
+                    self.dirty = True
                     print(f"Level button clicked, new level index: {self.current_level_index}")
         return None, None
 
     def draw(self, screen):
+        """Repaint the menu if anything on it changed; returns [] when the screen is up to date"""
+        if not self.dirty:
+            return []
+        self.dirty = False
         screen.fill(BACKGROUND_COLOR)
         self.play_button, self.level_button = menu.draw_start_menu(screen)
+        self.hover = hover_key((self.play_button, self.level_button), pygame.mouse.get_pos())
+        return None
+
+    def redraw_timeout(self):
+        return 0 if self.dirty else None
 
     def on_enter(self):
+        self.dirty = True
         pygame.display.set_caption("Tetris - Menu")
         if hasattr(menu, 'current_level_index'):
             self.current_level_index = menu.current_level_index
 
+# Screen region of the board, reported as dirty when the board or falling piece changes
+GRID_RECT = pygame.Rect(GRID_START_X, 0, GRID_WIDTH * BLOCK_SIZE, GRID_HEIGHT * BLOCK_SIZE)
+
 class PlayingState(GameState):
-    """Game playing state."""
-    def __init__(self):
+    """Game playing state: a thin pygame adapter over engine.Engine.
+
+    The engine advances in fixed steps of 1000 / tick_rate ms, however
+    often the screen is drawn: frame time goes into an accumulator that is
+    drained one tick at a time, and any remainder waits for the next frame.
+
+    Key presses are timestamped when they are polled. The time until the
+    tick that moves the piece and until the frame that shows it is
+    collected and reported when the game ends.
+    """
+    def __init__(self, tick_rate=TICK_RATE):
+        self.tick_rate = tick_rate
         self.state = None
         self.current_level = 1
+        self.last_grid_key = None
+        self.message_rects = []
+        self.shown_messages = None
+        self.message_expiry = None
+        self.recorder = None
+        self.ticks = 0
+        self.accumulator = 0
+        self.pending_inputs = []
+        self.pending_stamps = []
+        self.undrawn_stamps = []
+        self.move_latency = control.LatencyStats("input to move")
+        self.display_latency = control.LatencyStats("input to frame")
+        self.prepared = None
+        self.scratch = None
+
+    def new_game(self):
+        """A fresh engine for current_level and the recorder for its replay"""
+        state = engine.Engine(self.current_level)
+        return state, replay.ReplayRecorder(state.seed, self.current_level, tick_rate=self.tick_rate)
+
+    def prepare(self, level):
+        """Set up the next game ahead of on_enter, e.g. during the countdown.
+
+        The game's first frame is drawn off screen, which brings the board
+        layer, the HUD layers and the text cache up to date, so the first
+        real frame costs no more than any other.
+        """
+        if level is not None:
+            self.current_level = level
+        self.prepared = self.new_game()
+        if self.scratch is None:
+            self.scratch = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.draw_game(self.scratch, self.prepared[0])
+
+    def piece_position(self):
+        """Everything about the falling piece an input can change"""
+        block = self.state.current_block
+        return (self.state.pieces_placed, design.piece_key(block), block.x, block.y,
+                design.piece_key(self.state.hold_block))
 
     def update(self, events, delta_time):
         if not self.state:
@@ -62,63 +150,206 @@ class PlayingState(GameState):
         for event in events:
             if event.type == pygame.QUIT:
                 print("QUIT event detected in game loop")
-                self.state.running = False
                 return "quit", None  # 返回"quit"作为退出信号
 
-        control.handle_events(self.state, events)
-        if not self.state.running:
-            return "quit", None
-
-        if not self.state.game_over:
-            control.handle_continuous_input(self.state)
-            control.handle_gravity(self.state, delta_time)
-            new_level = self.current_level + (self.state.lines_cleared // LINES_PER_LEVEL)
-            if new_level != self.current_level:
-                self.current_level = new_level
-                level_speed_factor = max(0.1, 1.0 - ((self.current_level - 1) * 0.15))
-                self.state.fall_speed = BASE_FALL_SPEED * level_speed_factor
-        elif self.state.game_over:
-            return "game_over", {"score": self.state.score, "current_level": self.current_level}
+        # Fixed steps keep the game identical at any frame rate, and replays exact
+        polled_at = time.perf_counter()
+        inputs = control.handle_events(events)
+        self.pending_inputs.extend(inputs)
+        self.pending_stamps.extend(polled_at for action, pressed in inputs if pressed)
+        self.accumulator = min(self.accumulator + delta_time, MAX_FRAME_TIME)
+        tick_time = 1000 / self.tick_rate
+        while self.accumulator >= tick_time and not self.state.game_over:
+            inputs, self.pending_inputs = self.pending_inputs, []
+            stamps, self.pending_stamps = self.pending_stamps, []
+            before = self.piece_position() if stamps else None
+            self.recorder.record(self.ticks, inputs)
+            self.state.tick(tick_time, inputs)
+            if stamps and self.piece_position() != before:
+                for stamp in stamps:
+                    self.move_latency.add(stamp)
+                self.undrawn_stamps.extend(stamps)
+            self.ticks += 1
+            self.recorder.checkpoint(self.ticks, self.state)
+            self.accumulator -= tick_time
+        if self.state.game_over:
+            self.recorder.finish(self.ticks)
+            try:
+                print(f"Replay saved to {self.recorder.save()}")
+            except OSError as e:
+                print(f"Error saving replay: {e}")
+            print(self.move_latency.report())
+            print(self.display_latency.report())
+            return "game_over", {"score": self.state.score, "current_level": self.state.level,
+                                 "start_level": self.state.start_level, "lines": self.state.lines_cleared}
 
         return None, None
 
+    def draw_game(self, screen, state):
+        """Draw state's board, pieces, HUD and messages.
+
+        Returns the changed HUD rects, whether the board changed and the rects the messages cover.
+        """
+        hud_rects = design.draw_hud(screen, state.next_blocks, state.hold_block, state.score,
+                                    state.combo_count, state.level, state.lines_cleared)
+        board_changed = design.draw_grid(screen, state.grid)
+        if not state.game_over:
+            design.draw_ghost_piece(screen, state.ghost_piece())
+            design.draw_block(screen, state.current_block)
+        message_rects = design.draw_score_animation(screen, design.FONT, SCREEN_WIDTH - 120, SCREEN_HEIGHT // 2,
+                                                    state.animations)
+        return hud_rects, board_changed, message_rects
+
     def draw(self, screen):
+        """Draw the game and return the screen regions that changed (None = all)"""
         if not self.state:
-            return
-        screen.fill(BACKGROUND_COLOR)
-        ghost_block = gameplay.get_ghost_piece(self.state.current_block, self.state.grid) if not self.state.game_over else None
-        design.draw_grid(screen, self.state.grid)
-        if not self.state.game_over:
-            design.draw_ghost_piece(screen, ghost_block)
-            design.draw_block(screen, self.state.current_block)
-        design.draw_next_blocks(screen, self.state.next_blocks)
-        design.draw_held_piece(screen, self.state.hold_block)
-        design.draw_score(screen, self.state.score, self.state.combo_count)
-        design.draw_game_level(screen, self.current_level)
-        design.draw_lines_cleared(screen, self.state.lines_cleared)
-        design.draw_score_animation(screen, design.font, SCREEN_WIDTH - 120, SCREEN_HEIGHT // 2)
+            return None
+        hud_rects, board_changed, message_rects = self.draw_game(screen, self.state)
+        for stamp in self.undrawn_stamps:
+            self.display_latency.add(stamp)
+        self.undrawn_stamps.clear()
+
+        block = self.state.current_block
+        grid_key = (design.piece_key(block), block.x, block.y, self.state.game_over)
+        last_grid_key, self.last_grid_key = self.last_grid_key, grid_key
+        # Messages float over the board and the HUD. Until one is shown or its expiry time
+        # comes they stay put; then update where they are and where they were
+        messages = self.state.animations
+        expiry = self.message_expiry
+        if (messages, messages.sequence) != self.shown_messages or (expiry is not None and self.state.now >= expiry):
+            hud_rects += message_rects + self.message_rects
+            self.message_rects = message_rects
+            self.shown_messages = (messages, messages.sequence)
+            self.message_expiry = messages.next_expiry()
+        if last_grid_key is None:
+            return None
+        if grid_key != last_grid_key or board_changed:
+            hud_rects.append(GRID_RECT)
+        return hud_rects
+
+    def redraw_timeout(self):
+        """Until the next tick: the board, the HUD and the messages only change on ticks"""
+        if not self.state or self.state.game_over:
+            return 0
+        return max(1, int(1000 / self.tick_rate - self.accumulator))
 
     def on_enter(self):
-        self.state = control.GameState(self.current_level)
-        self.state.fall_speed = BASE_FALL_SPEED * max(0.1, 1.0 - ((self.current_level - 1) * 0.15))
+        if self.prepared and self.prepared[0].start_level == self.current_level:
+            self.state, self.recorder = self.prepared
+        else:
+            self.state, self.recorder = self.new_game()
+        self.prepared = None
+        self.ticks = 0
+        self.accumulator = 0
+        self.pending_inputs = []
+        self.pending_stamps = []
+        self.undrawn_stamps = []
+        self.move_latency = control.LatencyStats("input to move")
+        self.display_latency = control.LatencyStats("input to frame")
+        self.last_grid_key = None
+        self.message_rects = []
+        self.shown_messages = None
+        self.message_expiry = None
         pygame.display.set_caption("Tetris - Playing")
 
     def on_exit(self):
         self.state = None
+        self.recorder = None
+
+class ReplayState(PlayingState):
+    """Replay viewer: plays a recorded game through the same engine and drawing as live play.
+
+    1, 2 and 3 select 1x, 10x and maximum speed, Left/Right seek ten seconds
+    and Escape returns to the menu.
+    """
+    SPEEDS = {pygame.K_1: 1, pygame.K_2: 10, pygame.K_3: None}
+    SEEK_SECONDS = 10
+    # Wall time spent simulating per frame at maximum speed
+    MAX_SPEED_BUDGET = 0.012
+
+    def __init__(self):
+        super().__init__()
+        self.path = None
+        self.player = None
+        self.speed = 1
+
+    def update(self, events, delta_time):
+        if not self.player:
+            return "menu", None
+
+        for event in events:
+            if event.type == pygame.QUIT:
+                return "quit", None
+            if event.type != pygame.KEYDOWN:
+                continue
+            if event.key in self.SPEEDS:
+                self.speed = self.SPEEDS[event.key]
+            elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                step = self.SEEK_SECONDS * self.player.replay.tick_rate
+                self.player.seek(self.player.tick + (step if event.key == pygame.K_RIGHT else -step))
+                self.accumulator = 0
+            elif event.key == pygame.K_ESCAPE:
+                return "menu", None
+
+        if self.speed is None:
+            deadline = time.perf_counter() + self.MAX_SPEED_BUDGET
+            while not self.player.finished and time.perf_counter() < deadline:
+                self.player.advance(16)
+        else:
+            self.accumulator += delta_time * self.speed
+            ticks = int(self.accumulator // self.player.tick_time)
+            self.accumulator -= ticks * self.player.tick_time
+            self.player.advance(ticks)
+        self.state = self.player.state
+        return None, None
+
+    def redraw_timeout(self):
+        """Until the next tick at the current speed; a finished replay only changes on input"""
+        if not self.player or self.speed is None:
+            return 0
+        if self.player.finished:
+            return None
+        return max(1, int((self.player.tick_time - self.accumulator) / self.speed))
+
+    def on_enter(self):
+        self.player = replay.ReplayPlayer(replay.Replay(self.path))
+        self.state = self.player.state
+        self.speed = 1
+        self.accumulator = 0
+        self.last_grid_key = None
+        self.message_rects = []
+        self.shown_messages = None
+        self.message_expiry = None
+        pygame.display.set_caption(f"Tetris - Replay {self.path}")
+
+    def on_exit(self):
+        self.player = None
+        self.state = None
 
 class GameOverState(GameState):
     """Game over state."""
     def __init__(self):
         self.score = 0
         self.current_level = 1
+        self.start_level = 1
+        self.lines = 0
+        self.game = None
+        self.recorded = False
         self.input_active = False
         self.input_text = ""
         self.new_high_score = False
         self.flash_start_time = 0
         self.restart_button = None
         self.was_game_over = False
+        self.hover = None
+        self.redraw_at = None
 
     def update(self, events, delta_time):
+        for event in events:
+            if event.type in REDRAW_EVENTS or event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                self.dirty = True
+            elif event.type == pygame.MOUSEMOTION:
+                self.dirty |= hover_key((self.restart_button,), event.pos) != self.hover
         if not self.was_game_over:
             self.new_high_score = gameplay.update_high_scores(self.score)
             if self.new_high_score:
@@ -133,7 +364,7 @@ class GameOverState(GameState):
 
         pygame.event.set_grab(False)
         if self.input_active:
-            self.input_active, self.input_text = menu.handle_game_over_input(events, self.input_text, self.score)
+            self.input_active, self.input_text = menu.handle_game_over_input(events, self.input_text, self.game)
             if not self.input_active and self.new_high_score:
                 self.flash_start_time = pygame.time.get_ticks()
                 print("Input completed, resetting flash_start_time for 5-second flash")
@@ -144,16 +375,49 @@ class GameOverState(GameState):
                 return "playing", self.current_level
         return None, None
 
+    def next_animation(self, now):
+        """Tick time of the next cursor blink or flash color change, or None when nothing animates"""
+        if self.input_active:
+            return (now // 500 + 1) * 500
+        flash_end = self.flash_start_time + 5000
+        if self.new_high_score and now < flash_end:
+            return min((now // 200 + 1) * 200, flash_end)
+        return None
+
     def draw(self, screen):
+        """Repaint on input or when an animation is due; returns [] when the screen is up to date"""
+        now = pygame.time.get_ticks()
+        if not self.dirty and (self.redraw_at is None or now < self.redraw_at):
+            return []
+        self.dirty = False
+        self.redraw_at = self.next_animation(now)
         screen.fill(BACKGROUND_COLOR)
         self.restart_button = menu.draw_game_over(
             screen, self.score, self.new_high_score, self.input_active, self.input_text, self.flash_start_time
         )
+        self.hover = hover_key((self.restart_button,), pygame.mouse.get_pos())
+        return None
+
+    def redraw_timeout(self):
+        if self.dirty:
+            return 0
+        if self.redraw_at is None:
+            return None
+        return max(1, self.redraw_at - pygame.time.get_ticks())
 
     def on_enter(self):
+        self.dirty = True
+        self.redraw_at = None
+        # Keep every completed game, even when the window is closed before a name is entered;
+        # a name entered later updates the same row
+        if not self.recorded:
+            self.game = gameplay.end_game(self.score, None, self.start_level, self.lines)
+            self.recorded = True
         pygame.display.set_caption("Tetris - Game Over")
 
     def on_exit(self):
+        self.game = None
+        self.recorded = False
         self.was_game_over = False
 
 class GameStateManager:
@@ -171,9 +435,13 @@ class GameStateManager:
         self.current_state = self.states[state_name]
         if state_name == "playing" and data is not None:
             self.current_state.current_level = data
+        elif state_name == "replay":
+            self.current_state.path = data
         elif state_name == "game_over" and data is not None:
             self.current_state.score = data["score"]
             self.current_state.current_level = data["current_level"]
+            self.current_state.start_level = data.get("start_level", 1)
+            self.current_state.lines = data.get("lines", 0)
         self.current_state.on_enter()
 
     def update(self, events, delta_time):
@@ -182,5 +450,7 @@ class GameStateManager:
         return None, None
 
     def draw(self, screen):
+        """Draw the current state; returns its dirty rects, or None for a full update"""
         if self.current_state:
-            self.current_state.draw(screen)
\ No newline at end of file
+            return self.current_state.draw(screen)
+        return None
\ No newline at end of file
@@ -1,39 +1,112 @@
 '''Tetris.py - Main loop and game initialization'''
+from startup import timer as startup_timer  # First, so the startup report covers every import
+import argparse
+import time
 import pygame
-from GSM import GameStateManager, MenuState, PlayingState, GameOverState
-from constants import *
+startup_timer.mark("import pygame")
+# The rules modules are loaded ahead of GSM only to time them separately
+startup_timer.load("import rules (engine, replay, highscores)", "engine", "replay")
+import design
+import fonts
 import menu
+startup_timer.mark("import drawing (design, menu, fonts)")
+from GSM import GameStateManager, MenuState, PlayingState, ReplayState, GameOverState
+from constants import *
+import profiler
+startup_timer.mark("import GSM, profiler")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play Tetris")
+    parser.add_argument("--replay", metavar="FILE", help="watch a recorded game instead of playing")
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE, help="simulation steps per second")
+    parser.add_argument("--fps", type=int, default=MAX_FPS, help="render frame cap (0 for uncapped)")
+    parser.add_argument("--profile", nargs="?", const="profile.csv", metavar="CSV",
+                        help="time each frame phase (F3 shows the overlay) and write a CSV summary on exit")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print how long each startup phase took, up to the first frame")
+    args = parser.parse_args(argv)
+
+    frame_profiler = None
+    if args.profile:
+        frame_profiler = profiler.FrameProfiler()
+        frame_profiler.instrument(design)
+        frame_profiler.instrument(menu)
 
-def main():
     pygame.init()
+    startup_timer.mark("pygame.init")
     screen = menu.create_screen()
+    startup_timer.mark("create window")
     clock = pygame.time.Clock()
-    countdown_font = pygame.font.Font(None, 100)
+    countdown_font = (None, 100, False)
 
     manager = GameStateManager()
     manager.register_state("menu", MenuState())
-    manager.register_state("playing", PlayingState())
+    playing_state = PlayingState(args.tick_rate)
+    manager.register_state("playing", playing_state)
     manager.register_state("game_over", GameOverState())
-    manager.switch_state("menu")
+    manager.register_state("replay", ReplayState())
+    if args.replay:
+        manager.switch_state("replay", args.replay)
+    else:
+        manager.switch_state("menu")
+    startup_timer.mark("create states")
+    startup_reported = not args.startup_report
 
+    # Input is polled every INPUT_POLL_INTERVAL ms; frames are drawn at most args.fps times a second.
+    # Screens that only change on input let the loop sleep in pygame.event.wait instead.
+    frame_interval = 1 / args.fps if args.fps else 0
+    last_frame = 0
     running = True
     countdown = None
     countdown_start_time = None
+    countdown_shown = countdown_rect = None
     next_state_pending = None
     next_data_pending = None
 
     while running:
-        events = pygame.event.get()
+        events = []
+        if countdown is None:
+            timeout = manager.current_state.redraw_timeout()
+        elif countdown == countdown_shown and playing_state.prepared:
+            timeout = max(1, countdown_start_time + 1000 - pygame.time.get_ticks())
+        else:
+            timeout = 0
+        if timeout != 0 and not (frame_profiler and frame_profiler.overlay_visible):
+            # Nothing to animate: sleep until input arrives or the next animation step is due
+            event = pygame.event.wait(timeout) if timeout else pygame.event.wait()
+            if event.type != pygame.NOEVENT:
+                events.append(event)
+        if frame_profiler:
+            frame_profiler.start_frame()
+        events += pygame.event.get()
         for event in events:
             if event.type == pygame.QUIT:
                 running = False
+            elif frame_profiler and event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                frame_profiler.toggle_overlay()
+                manager.current_state.dirty = True
+        if frame_profiler:
+            frame_profiler.mark("events")
 
-        delta_time = clock.tick(60)
+        delta_time = clock.tick()
+        draw_frame = time.perf_counter() - last_frame >= frame_interval
+        if draw_frame:
+            last_frame = time.perf_counter()
 
         # Handle countdown before entering next state
         if countdown is not None:
-            screen.fill(BACKGROUND_COLOR)
-            menu.draw_countdown(screen, countdown_font, countdown)
+            if countdown != countdown_shown:
+                if draw_frame:
+                    # After the first digit only the digit's own rect is redrawn
+                    rect = menu.draw_countdown(screen, countdown_font, countdown, countdown_rect)
+                    if countdown_rect is None:
+                        pygame.display.flip()  # 更新倒计时画面
+                    else:
+                        pygame.display.update([countdown_rect, rect])
+                    countdown_shown, countdown_rect = countdown, rect
+            elif not playing_state.prepared:
+                # Build the next game and warm its caches while the countdown runs
+                playing_state.prepare(next_data_pending)
             current_time = pygame.time.get_ticks()
             if current_time - countdown_start_time >= 1000:
                 countdown -= 1
@@ -44,13 +117,15 @@ def main():
                     manager.switch_state(next_state_pending, next_data_pending)
                 next_state_pending = None
                 next_data_pending = None
-            pygame.display.flip()  # 更新倒计时画面
         else:
             # Update the current state without immediate switching
             next_state, data = manager.current_state.update(events, delta_time)  # 直接调用当前状态的update
+            if frame_profiler:
+                frame_profiler.mark("update")
             if next_state == "playing":
                 countdown = 3
                 countdown_start_time = pygame.time.get_ticks()
+                countdown_shown = countdown_rect = None
                 next_state_pending = next_state
                 next_data_pending = data
             elif next_state == "quit":
@@ -59,9 +134,37 @@ def main():
                 manager.switch_state(next_state, data)
 
             # 绘制当前状态
-            manager.draw(screen)
-            pygame.display.flip()
+            if draw_frame:
+                if frame_profiler and frame_profiler.overlay_visible:
+                    # The overlay is drawn over a fresh frame every time
+                    manager.current_state.dirty = True
+                dirty_rects = manager.draw(screen)
+                if frame_profiler:
+                    frame_profiler.mark("draw")
+                    if frame_profiler.overlay_visible:
+                        frame_profiler.draw_overlay(screen)
+                        frame_profiler.mark("overlay")
+                        dirty_rects = None
+                if dirty_rects is None:
+                    pygame.display.flip()
+                elif dirty_rects:
+                    pygame.display.update(dirty_rects)
+                if frame_profiler:
+                    frame_profiler.mark("flip")
+                    frame_profiler.end_frame()
+                if not startup_reported:
+                    startup_reported = True
+                    startup_timer.mark("first frame")
+                    print(startup_timer.report())
+                    print(f"Fonts: {fonts.stats.time * 1000:.1f} ms resolving, {fonts.stats.cached} paths from "
+                          f"{FONT_CACHE_FILE}, {fonts.stats.scanned} system font lookups")
+
+        if not draw_frame:
+            pygame.time.wait(INPUT_POLL_INTERVAL)
 
+    if frame_profiler:
+        frame_profiler.write_csv(args.profile)
+        print(f"Frame profile written to {args.profile}")
     pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+'''animations.py - Time-based on-screen messages kept in a min-heap by expiry time'''
+import heapq
+
+# Message slots: a new message replaces the one shown in the same slot
+SCORE, MESSAGE, COMBO = "score", "message", "combo"
+
+
+class Animations:
+    """Messages such as "+800", "Tetris", "COMBO x3" or "PERFECT CLEAR!" with absolute expiry times.
+
+    Times are milliseconds on the game clock (Session.now), so how long a
+    message stays up depends neither on the frame rate nor on how often it
+    is drawn. Expiry times sit in a min-heap: expire() pops only what is
+    due, at O(log n) each, and next_expiry() says when the screen next
+    changes so a caller can sleep or skip frames until then. A message
+    replaced before it expires leaves a stale heap entry behind, which is
+    recognised by its sequence number and dropped.
+    """
+    def __init__(self):
+        self.heap = []  # (expires, sequence, slot)
+        self.active = {}  # slot -> (text, expires, sequence)
+        self.sequence = 0
+
+    def __len__(self):
+        return len(self.active)
+
+    def show(self, slot, text, expires):
+        """Show text in slot until the game clock reaches expires"""
+        self.sequence += 1
+        self.active[slot] = (text, expires, self.sequence)
+        heapq.heappush(self.heap, (expires, self.sequence, slot))
+
+    def get(self, slot):
+        """The text shown in slot, or None"""
+        entry = self.active.get(slot)
+        return entry[0] if entry else None
+
+    def expire(self, now):
+        """Remove the messages whose time is up; return True if any was removed"""
+        removed = False
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            _, sequence, slot = heapq.heappop(heap)
+            entry = self.active.get(slot)
+            if entry and entry[2] == sequence:
+                del self.active[slot]
+                removed = True
+        return removed
+
+    def next_expiry(self):
+        """Game clock time of the next expiry, or None when nothing is shown"""
+        heap = self.heap
+        while heap:
+            expires, sequence, slot = heap[0]
+            entry = self.active.get(slot)
+            if entry and entry[2] == sequence:
+                return expires
+            heapq.heappop(heap)
+        return None
+
+    def clear(self):
+        self.heap.clear()
+        self.active.clear()
@@ -0,0 +1,138 @@
+'''batch.py - Vectorized NumPy simulator stepping many boards at once'''
+import numpy as np
+from pieces import PIECES
+from constants import *
+
+FULL_ROW = (1 << GRID_WIDTH) - 1
+MAX_PIECE_ROWS = 4
+
+# Game end causes reported in BatchEngine.top_out. INVALID is a placement that
+# is out of bounds or blocked from the spawn row, i.e. a bad action, not a top-out;
+# LOCK_OUT and BLOCK_OUT match engine.LOCK_OUT and engine.BLOCK_OUT
+NOT_TOPPED_OUT, INVALID, LOCK_OUT, BLOCK_OUT = range(4)
+
+# Lookup tables indexed by [shape_index, rotation]
+PIECE_MASKS = np.zeros((len(PIECES), 4, MAX_PIECE_ROWS), dtype=np.int64)
+PIECE_WIDTHS = np.zeros((len(PIECES), 4), dtype=np.int64)
+PIECE_HEIGHTS = np.zeros((len(PIECES), 4), dtype=np.int64)
+for _index, _states in enumerate(PIECES):
+    for _rotation, _state in enumerate(_states):
+        PIECE_MASKS[_index, _rotation, :len(_state.masks)] = _state.masks
+        PIECE_WIDTHS[_index, _rotation] = _state.width
+        PIECE_HEIGHTS[_index, _rotation] = len(_state.masks)
+SPAWN_X = GRID_WIDTH // 2 - PIECE_WIDTHS[:, 0] // 2
+
+LINE_SCORES = np.array([0] + [SCORES[n] for n in range(1, 5)], dtype=np.int64)
+COMBO_BONUSES = np.array(COMBO_BONUS, dtype=np.int64)
+B2B_BONUS = int(SCORES[4] * (BACK_TO_BACK_BONUS - 1))
+
+
+class BatchEngine:
+    """N independent games whose boards live in one (N, GRID_HEIGHT) array.
+
+    Each board row is a bit mask (bit x = column x) like board.Board.rows.
+    step() hard-drops every board's current piece at the requested rotation
+    and column, then clears lines, scores and checks for top-out across the
+    whole batch at once. Scoring follows gameplay.clear_lines/update_combo
+    and engine.Engine.hard_drop exactly; hold and T-spins are not modelled
+    because a drop straight from the spawn row can never be a spin.
+    """
+    def __init__(self, n, seed=None):
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        self.boards = np.zeros((n, GRID_HEIGHT), dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lines_cleared = np.zeros(n, dtype=np.int64)
+        self.combo_count = np.zeros(n, dtype=np.int64)
+        self.back_to_back = np.zeros(n, dtype=bool)
+        self.all_clear = np.zeros(n, dtype=bool)
+        self.pieces_placed = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.top_out = np.zeros(n, dtype=np.int8)
+        self.bag = self._new_bags()
+        self.bag_pos = 0
+        self.current = self.bag[:, 0].copy()
+
+    def _new_bags(self):
+        """Draw one shuffled 7-bag per board"""
+        return self.rng.permuted(np.tile(np.arange(len(PIECES)), (self.n, 1)), axis=1)
+
+    def _advance_queue(self):
+        self.bag_pos += 1
+        if self.bag_pos == self.bag.shape[1]:
+            self.bag = self._new_bags()
+            self.bag_pos = 0
+        self.current = self.bag[:, self.bag_pos].copy()
+
+    def collisions(self, pieces, rotations, xs, boards=None):
+        """Return an (N, GRID_HEIGHT + 1) bool array: True where the piece collides at row y"""
+        boards = self.boards if boards is None else boards
+        masks = PIECE_MASKS[pieces, rotations] << xs[:, None]
+        padded = np.concatenate(
+            [boards, np.full((len(boards), MAX_PIECE_ROWS), FULL_ROW, dtype=boards.dtype)], axis=1)
+        windows = np.lib.stride_tricks.sliding_window_view(padded, MAX_PIECE_ROWS, axis=1)
+        return (windows & masks[:, None, :]).any(axis=2)
+
+    def landing_rows(self, pieces, rotations, xs):
+        """Hard drop rows for each board, -1 where the piece cannot spawn there"""
+        in_bounds = (xs >= 0) & (xs + PIECE_WIDTHS[pieces, rotations] <= GRID_WIDTH)
+        safe_xs = np.where(in_bounds, xs, 0)
+        collide = self.collisions(pieces, rotations, safe_xs)
+        landing = collide.argmax(axis=1) - 1
+        return np.where(in_bounds, landing, -1)
+
+    def step(self, rotations, xs):
+        """Drop every live board's current piece at (rotation, x) and apply the rules"""
+        rotations = np.asarray(rotations, dtype=np.int64)
+        xs = np.asarray(xs, dtype=np.int64)
+        live = ~self.game_over
+        pieces = self.current
+        landing = self.landing_rows(pieces, rotations, xs)
+
+        invalid = live & (landing < 0)
+        self.game_over |= invalid
+        self.top_out[invalid] = INVALID
+        active = live & ~invalid
+
+        # Place pieces
+        rows = np.arange(self.n)[:, None]
+        row_idx = np.clip(landing, 0, None)[:, None] + np.arange(MAX_PIECE_ROWS)
+        xs = np.where(active, xs, 0)
+        masks = np.where(active[:, None], PIECE_MASKS[pieces, rotations] << xs[:, None], 0)
+        padded = np.concatenate([self.boards, np.zeros((self.n, MAX_PIECE_ROWS), dtype=self.boards.dtype)], axis=1)
+        padded[rows, row_idx] |= masks
+        boards = padded[:, :GRID_HEIGHT]
+
+        # Clear lines: move full rows to the top (stable) and blank them
+        full = boards == FULL_ROW
+        cleared = full.sum(axis=1)
+        order = np.argsort(~full, axis=1, kind="stable")
+        boards = np.take_along_axis(boards, order, axis=1)
+        boards[np.arange(GRID_HEIGHT)[None, :] < cleared[:, None]] = 0
+        self.boards = boards
+
+        # Scoring (hard drop from the spawn row, line clears, combo, b2b, perfect clear)
+        did_clear = active & (cleared > 0)
+        combo = np.where(did_clear, self.combo_count + 1, 0)
+        combo_bonus = np.where(combo > 1, COMBO_BONUSES[np.minimum(combo, len(COMBO_BONUSES) - 1)], 0)
+        tetris = cleared == 4
+        b2b_bonus = np.where(did_clear & tetris & self.back_to_back, B2B_BONUS, 0)
+        perfect = did_clear & ~boards.any(axis=1)
+        gained = 2 * landing + LINE_SCORES[cleared] + combo_bonus + b2b_bonus + np.where(perfect, ALL_CLEAR_BONUS, 0)
+
+        self.score += np.where(active, gained, 0)
+        self.lines_cleared += np.where(active, cleared, 0)
+        self.pieces_placed += active
+        self.combo_count = np.where(active, combo, self.combo_count)
+        self.back_to_back = np.where(did_clear, tetris, self.back_to_back)
+        self.all_clear = np.where(did_clear, perfect, self.all_clear)
+
+        # Spawn the next piece; it tops out if its spawn position is blocked, and
+        # that is a lock-out when the piece just placed never got below the spawn rows
+        locked_in_spawn = landing + PIECE_HEIGHTS[pieces, rotations] <= SPAWN_ROWS
+        self._advance_queue()
+        spawn_rotations = np.zeros(self.n, dtype=np.int64)
+        topped_out = active & self.collisions(self.current, spawn_rotations, SPAWN_X[self.current])[:, 0]
+        self.game_over |= topped_out
+        self.top_out[topped_out] = np.where(locked_in_spawn[topped_out], LOCK_OUT, BLOCK_OUT)
+        return active
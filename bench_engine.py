@@ -0,0 +1,223 @@
+'''bench_engine.py - Engine microbenchmarks with a JSON baseline and regression threshold'''
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import engine
+import gameplay
+from board import Board
+from constants import *
+
+BASELINE_FILE = "engine_baseline.json"
+# Allowed slowdown against the baseline before a benchmark fails (percent)
+DEFAULT_THRESHOLD = 10
+# Shortest timed run; operation counts are doubled until a run takes this long (seconds)
+MIN_RUN_TIME = 0.1
+
+# name -> (setup, operations per run); see benchmark()
+BENCHMARKS = {}
+
+
+def benchmark(name, number):
+    """Register setup(rng, number) -> run, where run() performs number operations.
+
+    Setup work (building boards and blocks) is not timed, only run() is.
+    """
+    def register(setup):
+        BENCHMARKS[name] = (setup, number)
+        return setup
+    return register
+
+
+def garbage_board(rng, height, full_rows=()):
+    """A seeded board whose bottom height rows have one hole each; full_rows are completely filled"""
+    board = Board()
+    for y in range(GRID_HEIGHT - height, GRID_HEIGHT):
+        hole = rng.randrange(GRID_WIDTH)
+        for x in range(GRID_WIDTH):
+            if x != hole or y in full_rows:
+                board.place((1,), x, y, rng.randrange(len(SHAPES)))
+    return board
+
+
+def random_block(rng, grid, top=0):
+    """A random block at a random free position at or above row top"""
+    while True:
+        block = gameplay.Block(rng.randrange(len(SHAPES)), rng.randrange(4))
+        block.x = rng.randrange(GRID_WIDTH - block.state.width + 1)
+        block.y = rng.randrange(top + 1)
+        if gameplay.is_valid_move(block, grid):
+            return block
+
+
+@benchmark("is_valid_move", 50000)
+def bench_is_valid_move(rng, number):
+    grid = garbage_board(rng, 8)
+    moves = [(random_block(rng, grid, 10), rng.choice((-1, 0, 1)), rng.choice((0, 1))) for _ in range(number)]
+    def run():
+        for block, dx, dy in moves:
+            gameplay.is_valid_move(block, grid, dx, dy)
+    return run
+
+
+@benchmark("Block.rotate", 20000)
+def bench_rotate(rng, number):
+    grid = garbage_board(rng, 8)
+    blocks = [(random_block(rng, grid, 10), rng.random() < 0.5) for _ in range(number)]
+    def run():
+        for block, clockwise in blocks:
+            block.rotate(grid, clockwise)
+    return run
+
+
+def clear_lines_setup(rng, number, height, full_rows):
+    template = garbage_board(rng, height, full_rows)
+    boards = [template.copy() for _ in range(number)]
+    session = gameplay.Session(rng.randrange(1 << 32))
+    def run():
+        for grid in boards:
+            gameplay.clear_lines(session, grid)
+    return run
+
+
+@benchmark("clear_lines single", 10000)
+def bench_clear_single(rng, number):
+    return clear_lines_setup(rng, number, 8, {GRID_HEIGHT - 1})
+
+
+@benchmark("clear_lines tetris", 10000)
+def bench_clear_tetris(rng, number):
+    return clear_lines_setup(rng, number, 8, set(range(GRID_HEIGHT - 4, GRID_HEIGHT)))
+
+
+@benchmark("clear_lines full board", 2000)
+def bench_clear_worst(rng, number):
+    return clear_lines_setup(rng, number, GRID_HEIGHT, set(range(GRID_HEIGHT)))
+
+
+@benchmark("get_ghost_piece", 20000)
+def bench_ghost(rng, number):
+    grid = garbage_board(rng, 4)
+    blocks = [random_block(rng, grid) for _ in range(number)]
+    ghost = gameplay.Block(0)
+    def run():
+        for block in blocks:
+            gameplay.get_ghost_piece(block, grid, ghost)
+    return run
+
+
+@benchmark("update_combo", 50000)
+def bench_update_combo(rng, number):
+    grid = garbage_board(rng, 4)
+    session = gameplay.Session(rng.randrange(1 << 32))
+    clears = [rng.choice((0, 1, 1, 2, 4)) for _ in range(number)]
+    def run():
+        combo = 0
+        for lines in clears:
+            combo, bonus = gameplay.update_combo(session, combo, lines, grid)
+    return run
+
+
+@benchmark("create_block", 50000)
+def bench_create_block(rng, number):
+    session = gameplay.Session(rng.randrange(1 << 32))
+    def run():
+        for _ in range(number):
+            gameplay.create_block(session)
+    return run
+
+
+@benchmark("Engine.hard_drop placement", 5000)
+def bench_placement(rng, number):
+    states = []
+    for _ in range(number):
+        state = engine.Engine(seed=rng.randrange(1 << 32))
+        state.grid = garbage_board(rng, 6)
+        block = state.current_block
+        block.x = rng.randrange(GRID_WIDTH - block.state.width + 1)
+        states.append(state)
+    def run():
+        for state in states:
+            state.hard_drop()
+    return run
+
+
+def time_run(setup, number, seed):
+    """Time one run of number operations with the garbage collector paused"""
+    run = setup(random.Random(seed), number)
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def measure(setup, number, repeat, seed):
+    """Return the ops/sec of repeat timed runs, each long enough to time reliably"""
+    while time_run(setup, number, seed) < MIN_RUN_TIME:
+        number *= 2
+    return [number / time_run(setup, number, seed) for _ in range(repeat)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine hot paths against a saved baseline")
+    parser.add_argument("--repeat", type=int, default=7, help="timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated boards")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fail when a benchmark is this many percent slower than the baseline")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)["benchmarks"]
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<28}{'ops/sec':>14}{'stdev':>9}{'baseline':>14}{'change':>9}")
+    for name, (setup, number) in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        runs = measure(setup, number, args.repeat, args.seed)
+        mean = statistics.mean(runs)
+        median = statistics.median(runs)
+        stdev = statistics.stdev(runs) if len(runs) > 1 else 0.0
+        results[name] = {"ops_per_sec": mean, "median": median, "stdev": stdev, "runs": len(runs)}
+        line = f"{name:<28}{mean:>14,.0f}{stdev / mean * 100:>8.1f}%"
+        if name in baseline:
+            # Medians are compared, as they are less sensitive to a single noisy run
+            base = baseline[name]["median"]
+            change = (median - base) / base * 100
+            line += f"{base:>14,.0f}{change:>+8.1f}%"
+            if change < -args.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save:
+        with open(args.baseline, "w") as file:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "seed": args.seed, "benchmarks": results}, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif not baseline:
+        print(f"No baseline at {args.baseline}; run with --save to create one")
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.threshold:g}%: "
+              + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
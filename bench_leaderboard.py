@@ -0,0 +1,77 @@
+'''bench_leaderboard.py - Leaderboard query benchmark over a large generated database'''
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import leaderboard
+from constants import *
+
+# Generated games are spread evenly over this many days before FIRST_DAY + DAYS
+DAYS = 730
+FIRST_DAY = datetime.datetime(2024, 1, 1)
+
+
+def fill(board, games, seed):
+    """Insert games random games, named and unnamed, spread over DAYS days"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(games):
+        played_at = FIRST_DAY + datetime.timedelta(seconds=rng.randrange(DAYS * 86400))
+        rows.append(("" if rng.random() < 0.2 else f"P{rng.randrange(1000)}", rng.randrange(1_000_000),
+                     rng.choice(LEVEL_OPTIONS), rng.randrange(300), played_at.strftime(leaderboard.DATE_FORMAT)))
+    with board.connection:
+        board.connection.executemany(
+            "INSERT INTO games (name, score, start_level, lines, played_at) VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def day(offset):
+    return (FIRST_DAY + datetime.timedelta(days=offset)).strftime(leaderboard.DATE_FORMAT)
+
+
+def queries():
+    """(name, keyword arguments for Leaderboard.top) for every benchmarked query"""
+    return [
+        ("all time", {}),
+        ("one level", {"start_level": 5}),
+        ("one player", {"name": "P42"}),
+        ("one day", {"since": day(400), "until": day(401)}),
+        ("one week", {"since": day(400), "until": day(407)}),
+        ("eleven months", {"since": day(300), "until": day(635)}),
+        ("everything since", {"since": day(0)}),
+        ("empty range", {"since": day(DAYS + 1), "until": day(DAYS + 2)}),
+        ("level and month", {"start_level": 10, "since": day(500), "until": day(530)}),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time Leaderboard.top() over a generated database")
+    parser.add_argument("--games", type=int, default=1_000_000, help="games in the generated database")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated games")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="tetris-bench-") as directory:
+        board = leaderboard.Leaderboard(os.path.join(directory, "leaderboard.db"))
+        start = time.perf_counter()
+        fill(board, args.games, args.seed)
+        board.connection.execute("ANALYZE")
+        print(f"Generated {args.games:,} games in {time.perf_counter() - start:.1f} s")
+
+        print(f"{'query':<20}{'median ms':>11}{'max ms':>9}")
+        for name, filters in queries():
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                board.top(**filters)
+                times.append((time.perf_counter() - start) * 1000)
+            print(f"{name:<20}{statistics.median(times):>11.2f}{max(times):>9.2f}")
+        board.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+'''bench_render.py - Headless render benchmark on the SDL dummy video driver'''
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import fonts
+from stats import percentile
+from animations import SCORE, MESSAGE, COMBO
+from constants import *
+
+
+class CountingSurface(pygame.Surface):
+    """pygame.Surface that counts how many are created"""
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        CountingSurface.created += 1
+
+
+def dense_board(grid, rng, height=14):
+    """Fill the bottom rows of grid with one-hole garbage"""
+    for y in range(GRID_HEIGHT - height, GRID_HEIGHT):
+        hole = rng.randrange(GRID_WIDTH)
+        for x in range(GRID_WIDTH):
+            if x != hole:
+                grid.place((1,), x, y, rng.randrange(len(SHAPES)))
+
+
+def playing_scene(GSM, dense=False, animations=False):
+    """A PlayingState whose piece slides left and right every frame"""
+    state = GSM.PlayingState()
+    state.on_enter()
+    game = state.state
+    if dense:
+        dense_board(game.grid, random.Random(0))
+    direction = [1]
+
+    def step(frame):
+        if not game.move_block(direction[0], 0):
+            direction[0] = -direction[0]
+        if animations:
+            game.announce(SCORE, "+800", 1000)
+            game.announce(MESSAGE, "BACK-TO-BACK TETRIS!", 1000)
+            game.announce(COMBO, f"COMBO x{frame % 9 + 2}! +150", 1000)
+    return state, step
+
+
+def build_scenes(GSM, highscores):
+    """Return {name: (state, step)} for every benchmark scene"""
+    for i in range(MAX_SCORES):
+        highscores.store.record(f"P{i}", 10000 * (i + 1), 1 + i, lines=10 * i)
+    highscores.store.flush()
+
+    menu_state = GSM.MenuState()
+    menu_state.on_enter()
+    game_over = GSM.GameOverState()
+    game_over.score = 123456
+    game_over.new_high_score = game_over.input_active = game_over.was_game_over = True
+    game_over.flash_start_time = pygame.time.get_ticks()
+
+    # Both screens skip drawing when nothing changed, so every frame is marked dirty
+    def repaint_menu(frame):
+        menu_state.dirty = True
+
+    def type_name(frame):
+        game_over.input_text = "PLAYER"[:frame % 7]
+        game_over.dirty = True
+
+    return {
+        "menu (full high scores)": (menu_state, repaint_menu),
+        "game over (name entry)": (game_over, type_name),
+        "playing (empty board)": playing_scene(GSM),
+        "playing (dense board)": playing_scene(GSM, dense=True),
+        "playing (score animations)": playing_scene(GSM, animations=True),
+    }
+
+
+def run_scene(screen, state, step, frames):
+    """Draw frames frames and return (frame times in ms, surfaces created, texts rendered)"""
+    times = []
+    surfaces = CountingSurface.created
+    texts = fonts.text_cache.misses
+    for frame in range(frames):
+        step(frame)
+        start = time.perf_counter()
+        dirty_rects = state.draw(screen)
+        if dirty_rects is None:
+            pygame.display.flip()
+        elif dirty_rects:
+            pygame.display.update(dirty_rects)
+        times.append((time.perf_counter() - start) * 1000)
+        pygame.event.pump()
+    return times, CountingSurface.created - surfaces, fonts.text_cache.misses - texts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the menu, playing and game over screens headlessly")
+    parser.add_argument("--frames", type=int, default=300, help="frames drawn per scene")
+    parser.add_argument("--filter", default="", help="only run scenes whose name contains this")
+    args = parser.parse_args(argv)
+
+    # Count every pygame.Surface the drawing code creates
+    pygame.Surface = CountingSurface
+    pygame.init()
+    # High scores go to a throwaway database, removed afterwards
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="tetris-bench-") as directory:
+        os.chdir(directory)
+        try:
+            import GSM
+            import highscores
+            import menu
+            screen = menu.create_screen()
+
+            print(f"{'scene':<28}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'max ms':>8}"
+                  f"{'surf/frame':>12}{'text/frame':>12}")
+            for name, (state, step) in build_scenes(GSM, highscores).items():
+                if args.filter not in name:
+                    continue
+                run_scene(screen, state, step, 10)  # warm caches
+                times, surfaces, texts = run_scene(screen, state, step, args.frames)
+                times.sort()
+                print(f"{name:<28}" + "".join(f"{percentile(times, f):>8.2f}" for f in (0.5, 0.95, 0.99))
+                      + f"{times[-1]:>8.2f}{surfaces / args.frames:>12.1f}{texts / args.frames:>12.1f}")
+            highscores.store.flush()
+        finally:
+            pygame.quit()
+            os.chdir(cwd)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+'''board.py - Bitboard backed playfield'''
+from constants import *
+
+FULL_ROW = (1 << GRID_WIDTH) - 1
+
+
+def shape_masks(shape):
+    """Convert a shape matrix into one bit mask per row (bit x = column x)"""
+    return tuple(sum(1 << x for x, cell in enumerate(row) if cell) for row in shape)
+
+
+class Board:
+    """Tetris playfield stored as one integer mask per row plus a color plane.
+
+    Bit x of ``rows[y]`` is set when cell (x, y) is occupied. The color plane
+    holds one byte per cell: 0 for empty, otherwise the shape index + 1.
+    Indexing ``board[y][x]`` still yields color tuples (``TRANSPARENT`` for
+    empty cells) so callers written against the old list-of-lists grid keep
+    working.
+
+    ``columns`` mirrors ``rows`` per column (bit y of ``columns[x]`` is set
+    when (x, y) is occupied) and is kept up to date by place() and
+    clear_rows(), so landing rows can be found without stepping down.
+    """
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.full_row = (1 << width) - 1
+        self.floor = 1 << height
+        self.rows = [0] * height
+        self.colors = bytearray(width * height)
+        self.columns = [0] * width
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        start = y * self.width
+        return [COLORS[c - 1] if c else TRANSPARENT for c in self.colors[start:start + self.width]]
+
+    def __iter__(self):
+        for y in range(self.height):
+            yield self[y]
+
+    def cell(self, x, y):
+        """Return the color index + 1 stored at (x, y), 0 when empty"""
+        return self.colors[y * self.width + x]
+
+    def is_empty(self):
+        """True when no cell is occupied (perfect clear)"""
+        return not any(self.rows)
+
+    def collides(self, masks, x, y):
+        """Check whether a piece given as row masks overlaps walls, floor or cells"""
+        rows = self.rows
+        for dy, mask in enumerate(masks):
+            if not mask:
+                continue
+            if x < 0:
+                if mask & ((1 << -x) - 1):
+                    return True
+                mask >>= -x
+            else:
+                mask <<= x
+            row_y = y + dy
+            if mask & ~self.full_row or row_y < 0 or row_y >= self.height or rows[row_y] & mask:
+                return True
+        return False
+
+    def place(self, masks, x, y, color_index):
+        """Lock a piece into the board (masks must not collide)"""
+        value = color_index + 1
+        for dy, mask in enumerate(masks):
+            if not mask:
+                continue
+            mask = mask << x if x >= 0 else mask >> -x
+            row_y = y + dy
+            self.rows[row_y] |= mask
+            base = row_y * self.width
+            while mask:
+                low = mask & -mask
+                column = low.bit_length() - 1
+                self.colors[base + column] = value
+                self.columns[column] |= 1 << row_y
+                mask ^= low
+
+    def drop_distance(self, bottoms, x, y):
+        """Rows a piece at (x, y) can fall, given the lowest cell row of each of its columns"""
+        distance = self.height
+        for cx, bottom in enumerate(bottoms):
+            below = (self.columns[x + cx] | self.floor) >> (y + bottom + 1)
+            rows = (below & -below).bit_length() - 1
+            if rows < distance:
+                distance = rows
+        return distance
+
+    def full_rows(self):
+        """Return the indices of completely filled rows, top to bottom"""
+        full = self.full_row
+        return [y for y, row in enumerate(self.rows) if row == full]
+
+    def clear_rows(self, rows_to_clear):
+        """Remove the given rows and shift everything above them down"""
+        width = self.width
+        for y in rows_to_clear:
+            del self.rows[y]
+            self.rows.insert(0, 0)
+            del self.colors[y * width:(y + 1) * width]
+            self.colors[0:0] = bytes(width)
+            above, below = (1 << y) - 1, ~((2 << y) - 1)
+            self.columns = [(column & below) | (column & above) << 1 for column in self.columns]
+        return len(rows_to_clear)
+
+    def load(self, rows, colors):
+        """Replace the contents of the board with the given rows and color plane"""
+        self.rows = list(rows)
+        self.colors = bytearray(colors)
+        self.columns = [0] * self.width
+        for y, row in enumerate(self.rows):
+            while row:
+                low = row & -row
+                self.columns[low.bit_length() - 1] |= 1 << y
+                row ^= low
+
+    def copy(self):
+        """Return an independent copy of the board"""
+        board = Board(self.width, self.height)
+        board.rows = self.rows[:]
+        board.colors = bytearray(self.colors)
+        board.columns = self.columns[:]
+        return board
@@ -3,6 +3,7 @@
 BLOCK_SIZE = 30
 GRID_WIDTH = 10
 GRID_HEIGHT = 20
+SPAWN_ROWS = 2 # Rows new pieces spawn in; a piece locked entirely inside them is a lock-out
 SCREEN_WIDTH = 200 + GRID_WIDTH * BLOCK_SIZE + 200
 SCREEN_HEIGHT = 600
 GRID_START_X = 200
@@ -30,6 +31,8 @@ COLORS = [
     (255, 0, 0),     # Z - Red
     (255, 0, 255)    # T - Purple
 ]
+# Lighter block colors used for the ghost piece
+GHOST_COLORS = [tuple(min(255, c + 50) for c in color) for color in COLORS]
 SHAPES = [
     [[1, 1, 1, 1]],                    # I
     [[1, 0, 0], [1, 1, 1]],            # L
@@ -43,12 +46,15 @@ SHAPES = [
 # Game logic constants
 DAS_DELAY = 380
 ARR_DELAY = 70
-MOVE_REPEAT_DELAY = 15
 LOCK_DELAY = 500
 MAX_LOCK_RESETS = 15
 BASE_FALL_SPEED = 1000
 SOFT_DROP_SPEED = 50
 LINES_PER_LEVEL = 10
+TICK_RATE = 240 # Fixed simulation ticks per second
+MAX_FPS = 240 # Render frame cap, 0 for uncapped
+MAX_FRAME_TIME = 250 # Longest frame the simulation catches up on (ms)
+INPUT_POLL_INTERVAL = 1 # Input polling interval between rendered frames (ms)
 
 # Scoring constants
 SCORES = {1: 100, 2: 300, 3: 500, 4: 800}
@@ -58,7 +64,15 @@ ALL_CLEAR_BONUS = 2000
 
 # Highscore files
 HIGH_SCORE_FILE = "highscores.json"
+LEADERBOARD_FILE = "leaderboard.db"
 MAX_SCORES = 5
+DEFAULT_MODE = "marathon"
+
+# Replays
+REPLAY_DIR = "replays"
+
+# Resolved system font paths, kept between runs
+FONT_CACHE_FILE = "fontcache.json"
 
 # Level options
 LEVEL_OPTIONS = [1, 5, 10, 15, 20, 25]
\ No newline at end of file
@@ -1,171 +1,296 @@
 '''design.py - Drawing functions for the game.'''
 import pygame
-import gameplay
+import animations
+import fonts
 from constants import *
 
-# Initialize fonts
-pygame.font.init()
-font = pygame.font.SysFont("couriernew", 24)
-small_font = pygame.font.SysFont(None, 30)
-large_font = pygame.font.SysFont("couriernew", 36)
+# Font keys (face, size, bold) resolved through the shared font registry
+FONT = ("couriernew", 24, False)
+SMALL_FONT = (None, 30, False)
+LARGE_FONT = ("couriernew", 36, False)
+
+# Cell sizes of the NEXT queue and HOLD box
+NEXT_BLOCK_SIZE = int(BLOCK_SIZE // 1.5)
+HOLD_BLOCK_SIZE = int(BLOCK_SIZE * 0.8)
+# Transparent color of the cell atlas, used by no sprite
+ATLAS_COLORKEY = (255, 0, 128)
+
+class CellAtlas:
+    """Every cell sprite pre-rendered onto one surface.
+
+    A row holds one style at one size, indexed like the board's color bytes:
+    0 is the empty cell and 1..7 are the COLORS (or GHOST_COLORS) entries.
+    Callers collect (surface, position, area) tuples and hand each layer
+    to Surface.blits in one call instead of two draw.rect calls per cell.
+    """
+    # (style, size): (fill colors or None for an outline, border colors)
+    ROWS = {
+        ("board", BLOCK_SIZE): (COLORS, [GRAY] * len(COLORS)),
+        ("block", BLOCK_SIZE): (COLORS, [WHITE] * len(COLORS)),
+        ("ghost", BLOCK_SIZE): (None, GHOST_COLORS),
+        ("block", NEXT_BLOCK_SIZE): (COLORS, [WHITE] * len(COLORS)),
+        ("block", HOLD_BLOCK_SIZE): (COLORS, [WHITE] * len(COLORS)),
+    }
+
+    def __init__(self):
+        self.surface = None
+        self.areas = {}
+
+    def build(self):
+        """Render all rows; done on first use, once the display exists"""
+        width = (len(COLORS) + 1) * BLOCK_SIZE
+        height = sum(size for _, size in self.ROWS)
+        self.surface = pygame.Surface((width, height))
+        if pygame.display.get_surface():
+            self.surface = self.surface.convert()
+        self.surface.fill(ATLAS_COLORKEY)
+        self.surface.set_colorkey(ATLAS_COLORKEY, pygame.RLEACCEL)
+
+        top = 0
+        for (style, size), (fills, borders) in self.ROWS.items():
+            areas = [pygame.Rect(i * size, top, size, size) for i in range(len(COLORS) + 1)]
+            for i, border in enumerate(borders):
+                if fills:
+                    pygame.draw.rect(self.surface, fills[i], areas[i + 1], 0)
+                pygame.draw.rect(self.surface, border, areas[i + 1], 1)
+            if style == "board":
+                # The empty board cell: a translucent gray square over the background
+                cell_bg = pygame.Surface((size, size), pygame.SRCALPHA)
+                cell_bg.fill((128, 128, 128, 100))
+                self.surface.fill(BACKGROUND_COLOR, areas[0])
+                self.surface.blit(cell_bg, areas[0])
+                pygame.draw.rect(self.surface, GRAY, areas[0], 1)
+            self.areas[style, size] = areas
+            top += size
+
+    def row(self, style, size=BLOCK_SIZE):
+        """Areas of the sprites of style at size, indexed by color byte"""
+        if self.surface is None:
+            self.build()
+        return self.areas[style, size]
+
+cell_atlas = CellAtlas()
+
+def block_cells(block, left, top, size, areas):
+    """(atlas, position, area) blits for each cell of block with its top-left cell at (left, top)"""
+    surface, area = cell_atlas.surface, areas[block.shape_index + 1]
+    return [(surface, (left + x * size, top + y * size), area) for x, y in block.state.cells]
+
+class BoardLayer:
+    """Persistent surface with the grid background and locked cells.
+
+    Only the cells whose color changed since the last render are redrawn,
+    so the board costs nothing between locks and line clears.
+    """
+    def __init__(self):
+        self.surface = None
+        self.colors = None
+
+    def render(self, grid):
+        """Bring the layer up to date with grid; return True if anything changed"""
+        if self.surface is None:
+            self.surface = pygame.Surface((GRID_WIDTH * BLOCK_SIZE, GRID_HEIGHT * BLOCK_SIZE))
+            self.colors = bytearray(b"\xff" * len(grid.colors))
+        if self.colors == grid.colors:
+            return False
+
+        areas = cell_atlas.row("board")
+        atlas = cell_atlas.surface
+        cells = []
+        for y in range(GRID_HEIGHT):
+            start = y * GRID_WIDTH
+            if self.colors[start:start + GRID_WIDTH] == grid.colors[start:start + GRID_WIDTH]:
+                continue
+            for x in range(GRID_WIDTH):
+                color_index = grid.colors[start + x]
+                if color_index != self.colors[start + x]:
+                    cells.append((atlas, (x * BLOCK_SIZE, y * BLOCK_SIZE), areas[color_index]))
+        self.surface.blits(cells, False)
+        self.colors[:] = grid.colors
+        return True
+
+board_layer = BoardLayer()
 
 def draw_grid(screen, grid):
-    """Draw the game grid"""
-    grid_bg = pygame.Surface((GRID_WIDTH * BLOCK_SIZE, GRID_HEIGHT * BLOCK_SIZE), pygame.SRCALPHA)
-    grid_bg.fill((128, 128, 128, 100))
-    screen.blit(grid_bg, (GRID_START_X, 0))
-    
-    for y in range(GRID_HEIGHT):
-        for x in range(GRID_WIDTH):
-            if grid[y][x] != TRANSPARENT:
-                pygame.draw.rect(screen, grid[y][x], 
-                    (GRID_START_X + x * BLOCK_SIZE, y * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE), 0)
-            pygame.draw.rect(screen, GRAY, 
-                (GRID_START_X + x * BLOCK_SIZE, y * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE), 1)
+    """Draw the game grid from the cached board layer; return True if the board changed"""
+    changed = board_layer.render(grid)
+    screen.blit(board_layer.surface, (GRID_START_X, 0))
+    return changed
 
 def draw_block(screen, block):
     """Draw the current active block"""
     if not block: return
-    shape = block.get_shape()
-    for y, row in enumerate(shape):
-        for x, cell in enumerate(row):
-            if cell:
-                rect = (GRID_START_X + (block.x + x) * BLOCK_SIZE, 
-                       (block.y + y) * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE)
-                pygame.draw.rect(screen, block.color, rect, 0)
-                pygame.draw.rect(screen, WHITE, rect, 1)
+    screen.blits(block_cells(block, GRID_START_X + block.x * BLOCK_SIZE, block.y * BLOCK_SIZE,
+                             BLOCK_SIZE, cell_atlas.row("block")), False)
 
 def draw_ghost_piece(screen, ghost_block):
     """Draw the ghost piece (landing preview)"""
     if not ghost_block: return
-    shape = ghost_block.get_shape()
-    for y, row in enumerate(shape):
-        for x, cell in enumerate(row):
-            if cell:
-                rect = pygame.Rect(GRID_START_X + (ghost_block.x + x) * BLOCK_SIZE, 
-                                 (ghost_block.y + y) * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE)
-                pygame.draw.rect(screen, ghost_block.color, rect, 1)
-
-def draw_preview(screen, blocks, title, x, y, width, height, block_size=BLOCK_SIZE//1.5):
-    """Draw a preview area (used for next blocks and held piece)"""
-    small_font = pygame.font.SysFont(None, 30)
-    text = small_font.render(title, True, WHITE)
-    screen.blit(text, (x, y - 30))
-    
-    bg = pygame.Surface((width, height), pygame.SRCALPHA)
+    screen.blits(block_cells(ghost_block, GRID_START_X + ghost_block.x * BLOCK_SIZE, ghost_block.y * BLOCK_SIZE,
+                             BLOCK_SIZE, cell_atlas.row("ghost")), False)
+
+# Where the HUD panels sit; the NEXT/HOLD values are the top left of their first cell
+PREVIEW_X = GRID_START_X + GRID_WIDTH * BLOCK_SIZE + 30
+HOLD_X = 30
+PREVIEW_Y = 50
+SCORE_Y = 350
+LEVEL_Y = 480
+NEXT_PANEL = pygame.Rect(PREVIEW_X - 10, PREVIEW_Y - 10, 6 * BLOCK_SIZE, 260)
+HOLD_PANEL = pygame.Rect(HOLD_X - 10, PREVIEW_Y - 10, 5 * HOLD_BLOCK_SIZE, 5 * HOLD_BLOCK_SIZE)
+SCORE_PANEL = pygame.Rect(PREVIEW_X - 5, SCORE_Y - 5, 160, 80)
+LEVEL_PANEL = pygame.Rect(PREVIEW_X - 5, LEVEL_Y - 5, 160, 40)
+LINES_PANEL = pygame.Rect(PREVIEW_X - 5, LEVEL_Y + 35, 160, 40)
+
+def piece_key(block):
+    """Identify how a block looks, for change detection"""
+    return (block.shape_index, block.rotation) if block else None
+
+def draw_panel(screen, rect):
+    """Draw a translucent black panel background"""
+    bg = pygame.Surface(rect.size, pygame.SRCALPHA)
     bg.fill((0, 0, 0, 100))
-    screen.blit(bg, (x - 10, y - 10))
-    
-    # Draw border
-    pygame.draw.rect(screen, (200, 200, 200), pygame.Rect(x - 10, y - 10, width, height), 2)
-    
-    # Draw blocks if provided
-    if not blocks: return
-    blocks = [blocks] if not isinstance(blocks, list) else blocks
-    
+    screen.blit(bg, rect)
+
+def draw_preview(screen, title, rect):
+    """Draw the frame of a preview area (used for next blocks and held piece)"""
+    text = fonts.render(SMALL_FONT, title, WHITE)
+    screen.blit(text, (rect.x + 10, rect.y - 20))
+    draw_panel(screen, rect)
+    pygame.draw.rect(screen, (200, 200, 200), rect, 2)
+
+def draw_preview_blocks(screen, blocks, x, y, block_size=NEXT_BLOCK_SIZE):
+    """Draw blocks stacked in a preview area whose first cell starts at (x, y)"""
+    areas = cell_atlas.row("block", block_size)
+    cells = []
     for i, block in enumerate(blocks):
         if not block: continue
-        shape = block.get_shape()
-        shape_width = len(shape[0]) * block_size
-        shape_height = len(shape) * block_size
+        shape_width = block.state.width * block_size
+        shape_height = block.state.height * block_size
         offset_x = x + (4 * block_size - shape_width) // 2
         offset_y = y + i * 80 + (4 * block_size - shape_height) // 2
-        
-        for y_pos, row in enumerate(shape):
-            for x_pos, cell in enumerate(row):
-                if cell:
-                    rect = pygame.Rect(offset_x + x_pos * block_size, offset_y + y_pos * block_size, 
-                                      block_size, block_size)
-                    pygame.draw.rect(screen, block.color, rect, 0)
-                    pygame.draw.rect(screen, WHITE, rect, 1)
+        cells += block_cells(block, offset_x, offset_y, block_size, areas)
+    screen.blits(cells, False)
 
 def draw_next_blocks(screen, next_blocks):
     """Draw the next blocks preview"""
-    preview_x = GRID_START_X + GRID_WIDTH * BLOCK_SIZE + 30
-    draw_preview(screen, next_blocks, "NEXT", preview_x, 50, 6 * BLOCK_SIZE, 260)
+    draw_preview_blocks(screen, next_blocks, PREVIEW_X, PREVIEW_Y)
 
 def draw_held_piece(screen, held_piece):
     """Draw the held piece"""
-    hold_x = 30
-    draw_preview(screen, held_piece, "HOLD", hold_x, 50, 5 * BLOCK_SIZE * 0.8, 5 * BLOCK_SIZE * 0.8, BLOCK_SIZE * 0.8)
-
-def draw_score_animation(screen, font, x, y):
-    """Draw score animation when lines are cleared"""
-    font = pygame.font.SysFont("couriernew", 24)
-    
-    # Display animations
-    animations = [
-        (gameplay.score_animation, (255, 255, 0), (x + 50, y - 30)),
-        (gameplay.clear_message, (255, 255, 255), (0, 0)),  
-        (gameplay.combo_animation, (255, 50, 50), (SCREEN_WIDTH // 2 - 60, SCREEN_HEIGHT // 3 + 40))
+    draw_preview_blocks(screen, [held_piece], HOLD_X, PREVIEW_Y, HOLD_BLOCK_SIZE)
+
+def draw_score_animation(screen, font, x, y, messages):
+    """Draw the score, line clear and combo messages currently shown by an animations.Animations; return their rects"""
+    slots = [
+        (animations.SCORE, (255, 255, 0), (x + 50, y - 30)),
+        (animations.MESSAGE, (255, 255, 255), None),
+        (animations.COMBO, (255, 50, 50), (SCREEN_WIDTH // 2 - 60, SCREEN_HEIGHT // 3 + 40))
     ]
-    
-    for anim, color, pos in animations:
-        if anim and (gameplay.score_timer > 0 or gameplay.combo_timer > 0):
-            text = font.render(anim, True, color)
-            if anim == gameplay.clear_message:  #
-                pos = (SCREEN_WIDTH // 2 - text.get_width() // 2, SCREEN_HEIGHT // 3)  
-            screen.blit(text, pos)
-    
-    # Update timers
-    if gameplay.score_timer > 0:
-        gameplay.score_timer -= 1
-    else:
-        gameplay.score_animation = gameplay.clear_message = None
-        
-    if gameplay.combo_timer > 0:
-        gameplay.combo_timer -= 1
-    else:
-        gameplay.combo_animation = None
+
+    rects = []
+    for slot, color, pos in slots:
+        anim = messages.get(slot)
+        if anim:
+            text = fonts.render(font, anim, color)
+            if pos is None:  # Line clear messages are centered
+                pos = (SCREEN_WIDTH // 2 - text.get_width() // 2, SCREEN_HEIGHT // 3)
+            rects.append(screen.blit(text, pos))
+    return rects
 
 def draw_score(screen, score, combo_count):
-    """Draw the score display"""
-    score_x = GRID_START_X + GRID_WIDTH * BLOCK_SIZE + 30
-    score_y = 350
-    
-    # Background
-    score_bg = pygame.Surface((160, 80), pygame.SRCALPHA)
-    score_bg.fill((0, 0, 0, 100))
-    screen.blit(score_bg, (score_x - 5, score_y - 5))
-    
-    # Score text
-    font = pygame.font.SysFont("couriernew", 24)
-    score_label = font.render("SCORE:", True, WHITE)
-    screen.blit(score_label, (score_x, score_y))
-    score_text = font.render(str(score), True, WHITE)
-    screen.blit(score_text, (score_x + score_label.get_width() + 10, score_y))
-    
+    """Draw the score value and combo counter"""
+    score_label = fonts.render(FONT, "SCORE:", WHITE)
+    score_text = fonts.render(FONT, str(score), WHITE)
+    screen.blit(score_text, (PREVIEW_X + score_label.get_width() + 10, SCORE_Y))
+
     # Combo display
     if combo_count > 0:
-        combo_text = font.render(f"COMBO: {combo_count}x", True, (255, 165, 0))
-        screen.blit(combo_text, (score_x, score_y + 40))
+        combo_text = fonts.render(FONT, f"COMBO: {combo_count}x", (255, 165, 0))
+        screen.blit(combo_text, (PREVIEW_X, SCORE_Y + 40))
 
 def draw_game_level(screen, current_level):
     """Draw the game level display"""
-    level_x = GRID_START_X + GRID_WIDTH * BLOCK_SIZE + 30
-    level_y = 480  # Position below the score display
-    
-    # Background
-    level_bg = pygame.Surface((160, 40), pygame.SRCALPHA)
-    level_bg.fill((0, 0, 0, 100))
-    screen.blit(level_bg, (level_x - 5, level_y - 5))
-    
-    # Level text
-    font = pygame.font.SysFont("couriernew", 24)
-    level_text = font.render(f"LEVEL: {current_level}", True, WHITE)
-    screen.blit(level_text, (level_x, level_y))
+    level_text = fonts.render(FONT, f"LEVEL: {current_level}", WHITE)
+    screen.blit(level_text, (PREVIEW_X, LEVEL_Y))
 
 def draw_lines_cleared(screen, lines_cleared):
     """Draw the lines cleared display with consistent style"""
-    level_x = GRID_START_X + GRID_WIDTH * BLOCK_SIZE + 30
-    level_y = 480  # Match with draw_game_level's y position
-    
-    # Background
-    lines_bg = pygame.Surface((160, 40), pygame.SRCALPHA)  # Same size as Level background
-    lines_bg.fill((0, 0, 0, 100))
-    screen.blit(lines_bg, (level_x - 5, level_y + 40 - 5))  # Position below Level
-    
-    # Lines cleared text
-    font = pygame.font.SysFont("couriernew", 24)  # Use the same font as Score and Level
-    lines_text = font.render(f"Lines: {lines_cleared}", True, WHITE)
-    screen.blit(lines_text, (level_x, level_y + 40))  # Center text within the background
\ No newline at end of file
+    lines_text = fonts.render(FONT, f"Lines: {lines_cleared}", WHITE)  # Same font as Score and Level
+    screen.blit(lines_text, (PREVIEW_X, LEVEL_Y + 40))
+
+def draw_hud_chrome(screen):
+    """Draw everything around the board that never changes: background, panels and titles"""
+    screen.fill(BACKGROUND_COLOR)
+    draw_preview(screen, "NEXT", NEXT_PANEL)
+    draw_preview(screen, "HOLD", HOLD_PANEL)
+    for rect in (SCORE_PANEL, LEVEL_PANEL, LINES_PANEL):
+        draw_panel(screen, rect)
+    screen.blit(fonts.render(FONT, "SCORE:", WHITE), (PREVIEW_X, SCORE_Y))
+
+class HudLayer:
+    """A screen region repainted by the module function named paint, paint(surface, *args), whenever its key changes.
+
+    The function is looked up by name on every repaint, so a wrapper put in
+    its place later (FrameProfiler.instrument) is the one that runs.
+    """
+    def __init__(self, rect, paint):
+        self.rect = rect
+        self.paint = paint
+        self.key = None
+
+    def repaint(self, surface, *args):
+        globals()[self.paint](surface, *args)
+
+class HudCompositor:
+    """Full-screen surface with the HUD around the board.
+
+    The chrome from draw_hud_chrome is baked into a static copy once.
+    Each value layer (score, level, lines, next queue, hold) covers its
+    own region; when its key changes the region is restored from the
+    static copy and repainted, otherwise it is left alone. Drawing the
+    HUD is then one blit of the composited surface.
+    """
+    def __init__(self):
+        self.static = None
+        self.surface = None
+        # Text layers run to the right edge of the screen, as long numbers overflow their panel
+        text_region = lambda panel: pygame.Rect(panel.x, panel.y, SCREEN_WIDTH - panel.x, panel.height)
+        self.layers = {
+            "next": HudLayer(NEXT_PANEL, "draw_next_blocks"),
+            "hold": HudLayer(HOLD_PANEL, "draw_held_piece"),
+            "score": HudLayer(text_region(SCORE_PANEL), "draw_score"),
+            "level": HudLayer(text_region(LEVEL_PANEL), "draw_game_level"),
+            "lines": HudLayer(text_region(LINES_PANEL), "draw_lines_cleared"),
+        }
+
+    def update(self, name, key, *args):
+        """Repaint layer name with args if key differs from last time; return its rect, or None"""
+        if self.surface is None:
+            self.static = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            if pygame.display.get_surface():
+                self.static = self.static.convert()
+            draw_hud_chrome(self.static)
+            self.surface = self.static.copy()
+        layer = self.layers[name]
+        if key == layer.key:
+            return None
+        layer.key = key
+        self.surface.set_clip(layer.rect)
+        self.surface.blit(self.static, layer.rect, layer.rect)
+        layer.repaint(self.surface, *args)
+        self.surface.set_clip(None)
+        return layer.rect
+
+hud = HudCompositor()
+
+def draw_hud(screen, next_blocks, hold_block, score, combo_count, level, lines_cleared):
+    """Blit the HUD, repainting only the layers whose values changed; return the rects of those layers"""
+    changed = [
+        hud.update("next", tuple(map(piece_key, next_blocks)), next_blocks),
+        hud.update("hold", piece_key(hold_block), hold_block),
+        hud.update("score", (score, combo_count), score, combo_count),
+        hud.update("level", level, level),
+        hud.update("lines", lines_cleared, lines_cleared),
+    ]
+    screen.blit(hud.surface, (0, 0))
+    return [rect for rect in changed if rect]
@@ -0,0 +1,299 @@
+'''engine.py - Headless Tetris rules engine driven by explicit ticks'''
+import animations
+import gameplay
+from constants import *
+
+# Engine input actions
+LEFT, RIGHT, ROTATE, SOFT_DROP, HARD_DROP, HOLD, ROTATE_CCW = range(7)
+# Top-out causes reported in Engine.top_out
+LOCK_OUT, BLOCK_OUT = "lock_out", "block_out"
+
+
+class InputTimer:
+    """Auto-shift timing for one held direction.
+
+    The press itself shifts once; after das_delay (Delayed Auto Shift) the
+    block shifts again, then once every arr_delay (Auto Repeat Rate).
+    Shifts are counted from the press time, so the number due is exact
+    however long the ticks are. An arr_delay of 0 shifts straight to the
+    wall once DAS is charged.
+    """
+    def __init__(self, das_delay, arr_delay):
+        self.das_delay = das_delay
+        self.arr_delay = arr_delay
+        self.press_time = None # When the key went down, None while released
+        self.shifts = 0 # Auto shifts already counted since the press
+
+    def press(self, now):
+        self.press_time = now
+        self.shifts = 0
+
+    def release(self):
+        self.press_time = None
+
+    def due(self, now):
+        """Return how many auto shifts fell due since the last call"""
+        if self.press_time is None or now - self.press_time < self.das_delay:
+            return 0
+        if self.arr_delay <= 0:
+            return GRID_WIDTH
+        total = 1 + int((now - self.press_time - self.das_delay) // self.arr_delay)
+        due, self.shifts = total - self.shifts, total
+        return due
+
+
+class Engine(gameplay.Session):
+    """Tetris rules engine that only advances when tick() is called.
+
+    The engine never reads the wall clock or the keyboard: elapsed time is
+    passed to tick() and accumulated in ``now`` (milliseconds), and input
+    arrives as (action, pressed) pairs. The same seed and input stream always
+    produce the same game, at whatever speed the caller drives it.
+
+    Every piece of per-game state lives on the instance (see
+    gameplay.Session), so any number of engines can run side by side.
+    """
+    def __init__(self, current_level=1, seed=None, das_delay=DAS_DELAY, arr_delay=ARR_DELAY):
+        gameplay.Session.__init__(self, seed)
+        self.start_level = current_level
+        self.das_delay = das_delay
+        self.arr_delay = arr_delay
+        self.reset()
+
+    def reset(self, keep_lines=False):
+        self.current_block, self.next_blocks, self.hold_block, self.hold_used, self.grid, \
+        self.score, self.combo_count, self.lines_cleared, _ = gameplay.reset_game(
+            self, self.start_level, keep_lines_cleared=keep_lines, current_lines_cleared=0)
+        self.game_over = False
+        self.top_out = None
+        self.level = self.start_level
+        self.fall_time = 0
+        self.fall_speed = gameplay.calculate_fall_speed(self.level)
+        self.lock_time = 0
+        self.has_landed = False
+        self.lock_resets = 0
+        self.max_lock_resets = MAX_LOCK_RESETS
+        self.is_soft_dropping = False
+        self.soft_drop_distance = 0
+        self.das_left = InputTimer(self.das_delay, self.arr_delay)
+        self.das_right = InputTimer(self.das_delay, self.arr_delay)
+        self.held = set()
+        self.last_action_was_rotation = False
+        self.pieces_placed = 0
+        self.ghost_block = None
+        self.ghost_key = None
+
+    def tick(self, delta_time, inputs=()):
+        """Advance the game by delta_time milliseconds after applying inputs"""
+        if self.game_over:
+            return
+        self.now += delta_time
+        if self.animations:
+            self.animations.expire(self.now)
+        for action, pressed in inputs:
+            if self.game_over:
+                return
+            if pressed:
+                self.press(action)
+            else:
+                self.release(action)
+        if not self.game_over:
+            self.handle_continuous_input()
+            self.handle_gravity(delta_time)
+
+    def run(self, input_stream, delta_time):
+        """Run one tick per item of input_stream (a list of inputs per tick)"""
+        ticks = 0
+        for inputs in input_stream:
+            if self.game_over:
+                break
+            self.tick(delta_time, inputs)
+            ticks += 1
+        return ticks
+
+    def press(self, action):
+        """Handle the initial press of an input action"""
+        if self.game_over:
+            return
+        self.held.add(action)
+        if action == ROTATE:
+            self.try_rotate()
+        elif action == ROTATE_CCW:
+            self.try_rotate(clockwise=False)
+        elif action == LEFT:
+            self.das_left.press(self.now)
+            self.das_right.release()
+            self.move_block(-1, 0)
+        elif action == RIGHT:
+            self.das_right.press(self.now)
+            self.das_left.release()
+            self.move_block(1, 0)
+        elif action == SOFT_DROP:
+            self.is_soft_dropping = True
+            self.soft_drop_distance = 0
+            self.fall_speed = SOFT_DROP_SPEED
+        elif action == HARD_DROP:
+            self.hard_drop()
+        elif action == HOLD and not self.hold_used:
+            self.hold()
+
+    def release(self, action):
+        """Handle the release of a held input action"""
+        self.held.discard(action)
+        # A direction still held after the other is released charges DAS again
+        if action == LEFT:
+            self.das_left.release()
+            if RIGHT in self.held:
+                self.das_right.press(self.now)
+        elif action == RIGHT:
+            self.das_right.release()
+            if LEFT in self.held:
+                self.das_left.press(self.now)
+        elif action == SOFT_DROP:
+            self.fall_speed = gameplay.calculate_fall_speed(self.level)
+            if self.is_soft_dropping and self.soft_drop_distance > 0:
+                soft_drop_score = gameplay.calculate_soft_drop_score(self.soft_drop_distance)
+                self.score += soft_drop_score
+                if soft_drop_score > 0:
+                    self.announce(animations.SCORE, f"+{soft_drop_score}", 1667)
+            self.is_soft_dropping = False
+            self.soft_drop_distance = 0
+
+    def handle_continuous_input(self):
+        """Apply every DAS/ARR auto shift that fell due for held left/right inputs"""
+        left, right = LEFT in self.held, RIGHT in self.held
+        block_moved = False
+
+        if left != right:
+            timer, dx = (self.das_left, -1) if left else (self.das_right, 1)
+            for _ in range(timer.due(self.now)):
+                if not self.move_block(dx, 0):
+                    break
+                block_moved = True
+
+        return block_moved
+
+    def handle_gravity(self, delta_time):
+        """Move the block down one row per fall_speed ms elapsed, carrying the remainder"""
+        self.fall_time += delta_time
+
+        if self.fall_time >= self.fall_speed:
+            # Several rows can fall in one tick at high speeds or low tick rates
+            rows = int(self.fall_time // self.fall_speed)
+            self.fall_time -= rows * self.fall_speed
+            block = self.current_block
+            moved = min(rows, self.grid.drop_distance(block.state.bottoms, block.x, block.y))
+            if moved:
+                block.y += moved
+                if self.is_soft_dropping:
+                    self.soft_drop_distance += moved
+                self.has_landed = False
+                self.lock_time = 0
+            if moved < rows:
+                # Resting on the stack: no time carries over
+                self.fall_time = 0
+                if not self.has_landed:
+                    self.has_landed = True
+                    self.lock_time = self.now
+
+        if self.has_landed and self.now - self.lock_time >= LOCK_DELAY:
+            if self.is_soft_dropping and self.soft_drop_distance > 0:
+                soft_drop_score = gameplay.calculate_soft_drop_score(self.soft_drop_distance)
+                self.score += soft_drop_score
+                self.soft_drop_distance = 0
+            self.lock_block()
+
+    def try_rotate(self, clockwise=True):
+        '''Attempt to rotate the current block using the SRS kick table.'''
+        if self.current_block.rotate(self.grid, clockwise):
+            self.reset_lock_delay()
+            self.last_action_was_rotation = True
+            return True
+        return False
+
+    def move_block(self, dx, dy):
+        if gameplay.is_valid_move(self.current_block, self.grid, dx=dx, dy=dy):
+            self.current_block.x += dx
+            self.current_block.y += dy
+            self.reset_lock_delay()
+            self.last_action_was_rotation = False
+            return True
+        return False
+
+    def reset_lock_delay(self):
+        if self.has_landed and self.lock_resets < self.max_lock_resets:
+            self.lock_time = self.now
+            self.lock_resets += 1
+
+    def ghost_piece(self):
+        """Landing preview of the current block, recomputed only after it moves or the board changes"""
+        block = self.current_block
+        key = (block.shape_index, block.rotation, block.x, block.y, self.pieces_placed)
+        if key != self.ghost_key:
+            self.ghost_key = key
+            self.ghost_block = gameplay.get_ghost_piece(block, self.grid, self.ghost_block)
+        return self.ghost_block
+
+    def hard_drop(self):
+        initial_y = self.current_block.y
+        self.current_block.y = gameplay.landing_y(self.current_block, self.grid)
+        drop_score = gameplay.calculate_hard_drop_score(initial_y, self.current_block.y)
+        self.score += drop_score
+        if drop_score > 0:
+            self.announce(animations.SCORE, f"+{drop_score}", 1667)
+        self.lock_block()
+
+    def hold(self):
+        if self.hold_block is None:
+            self.hold_block = self.current_block
+            self.current_block = self.next_blocks.pop(0)
+            self.next_blocks.append(gameplay.create_block(self))
+        else:
+            self.hold_block, self.current_block = self.current_block, self.hold_block
+        self.hold_used = True
+        self.current_block.x = GRID_WIDTH // 2 - len(self.current_block.get_shape()[0]) // 2
+        self.current_block.y = 0
+        self.has_landed = False
+        self.lock_time = 0
+        self.lock_resets = 0
+        self.last_action_was_rotation = False
+
+    def lock_block(self):
+        """Lock the current block where it is and reset the lock state"""
+        is_tspin = gameplay.check_for_tspin(self.current_block, self.grid, self.last_action_was_rotation)
+        self.place_block(is_tspin)
+        self.has_landed = False
+        self.lock_time = 0
+        self.lock_resets = 0
+        self.last_action_was_rotation = False
+
+    def place_block(self, is_tspin):
+        locked = self.current_block
+        gameplay.place_block(locked, self.grid)
+        cleared, line_score = gameplay.clear_lines(self, self.grid)
+        self.lines_cleared += cleared
+        self.pieces_placed += 1
+
+        if is_tspin and cleared > 0:
+            line_score = int(line_score * 1.5)
+            self.announce(animations.SCORE, f"T-SPIN +{line_score}", 2500)
+
+        self.score += line_score
+        self.combo_count, combo_score = gameplay.update_combo(self, self.combo_count, cleared, self.grid)
+        self.score += combo_score
+
+        new_level = self.start_level + self.lines_cleared // LINES_PER_LEVEL
+        if new_level != self.level:
+            self.level = new_level
+            if not self.is_soft_dropping:
+                self.fall_speed = gameplay.calculate_fall_speed(self.level)
+
+        self.current_block = self.next_blocks.pop(0)
+        self.next_blocks.append(gameplay.create_block(self))
+        self.hold_used = False
+
+        if not gameplay.is_valid_move(self.current_block, self.grid):
+            self.game_over = True
+            # The game ends when the next piece cannot spawn either way; a lock-out is
+            # when the last piece never got below the spawn rows
+            self.top_out = LOCK_OUT if locked.y + len(locked.masks) <= SPAWN_ROWS else BLOCK_OUT
@@ -0,0 +1,121 @@
+'''fonts.py - Shared font registry and rendered text cache'''
+import json
+import os
+import time
+from collections import OrderedDict
+import pygame
+from constants import *
+
+# Resolved fonts keyed by (face, size, bold)
+_fonts = {}
+# Font file and fake-bold flag of each "face|bold", shared by all sizes and saved to FONT_CACHE_FILE
+_paths = None
+
+
+class FontStats:
+    """Where font resolution time went, for the startup report"""
+    def __init__(self):
+        self.cached = 0 # Paths found in FONT_CACHE_FILE
+        self.scanned = 0 # Paths looked up in the system font list
+        self.time = 0.0 # Seconds spent resolving and loading fonts
+
+stats = FontStats()
+
+
+def _load_paths():
+    global _paths
+    _paths = {}
+    try:
+        with open(FONT_CACHE_FILE, "r") as file:
+            _paths = json.load(file)
+    except (OSError, ValueError):
+        pass
+
+
+def _save_paths():
+    try:
+        with open(FONT_CACHE_FILE, "w") as file:
+            json.dump(_paths, file, indent=2)
+    except OSError as e:
+        print(f"Error saving font cache: {e}")
+
+
+def resolve(face, bold=False):
+    """Return (font file, fake bold) for a system font face, the way pygame.font.SysFont picks them.
+
+    SysFont lists every installed font the first time it is called, which
+    can take hundreds of milliseconds, so the answers are kept on disk and
+    the list is only built for faces the cache does not know yet. A cached
+    file that no longer exists is looked up again; delete FONT_CACHE_FILE
+    to re-scan after installing fonts.
+    """
+    if face is None:
+        return None, bold
+    if _paths is None:
+        _load_paths()
+    key = f"{face}|{int(bold)}"
+    entry = _paths.get(key)
+    if entry is not None and (entry[0] is None or os.path.exists(entry[0])):
+        stats.cached += 1
+        return tuple(entry)
+    # SysFont hands its choice to the constructor instead of opening it
+    entry = pygame.font.SysFont(face, 0, bold=bold, constructor=lambda path, size, fake_bold, fake_italic: (path, fake_bold))
+    stats.scanned += 1
+    _paths[key] = list(entry)
+    _save_paths()
+    return entry
+
+
+def get_font(face, size, bold=False):
+    """Return the font for (face, size, bold), resolving it only once"""
+    key = (face, size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        start = time.perf_counter()
+        if not pygame.font.get_init():
+            pygame.font.init()
+        path, fake_bold = resolve(face, bold)
+        font = _fonts[key] = pygame.font.Font(path, size)
+        if fake_bold:
+            font.set_bold(True)
+        stats.time += time.perf_counter() - start
+    return font
+
+
+class TextCache:
+    """Bounded LRU cache of rendered text surfaces keyed by (font, text, color).
+
+    Returned surfaces are shared between callers and must only be blitted,
+    never drawn on.
+    """
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font_key, text, color):
+        key = (font_key, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = get_font(*font_key).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = self.misses = 0
+
+
+text_cache = TextCache()
+
+
+def render(font_key, text, color):
+    """Render antialiased text with a (face, size, bold) font key through the shared cache"""
+    return text_cache.render(font_key, text, color)
@@ -1,91 +1,96 @@
 '''gameplay.py - Game logic module'''
 import random
-import json
-import os
-import design
+import animations
+from board import Board, shape_masks
+from pieces import KICKS, PIECES
 from constants import *
 
-# Animation variables
-score_animation = combo_animation = clear_message = None
-score_timer = combo_timer = 0
-
-# Game state tracking
-back_to_back = all_clear = False
-current_bag = []
-
-
 class Block:
     """Tetris block class"""
-    def __init__(self, shape_index):
+    def __init__(self, shape_index, rotation=0):
         self.shape_index = shape_index
-        self.shape = design.SHAPES[shape_index]
-        self.color = design.COLORS[shape_index]
-        self.x = design.GRID_WIDTH // 2 - len(self.shape[0]) // 2
+        self.rotation = rotation
+        self.state = PIECES[shape_index][rotation]
+        self.color = COLORS[shape_index]
+        self.x = GRID_WIDTH // 2 - self.state.width // 2
         self.y = 0
 
-    def rotate(self, grid):
+    @property
+    def shape(self):
+        return self.state.shape
+
+    @property
+    def masks(self):
+        return self.state.masks
+
+    def rotate(self, grid, clockwise=True):
         """Rotate the block with SRS wall kicks"""
-        original_shape = self.shape
-        new_shape = [list(row) for row in zip(*self.shape[::-1])]
-        original_x, original_y = self.x, self.y
-
-        # Determine if it's an I piece
-        is_i_piece = self.shape_index == 0
-        kick_tests = [(-1, 0), (-1, 1), (0, -2), (-1, -2)] if not is_i_piece else [(-2, 0), (1, 0), (-2, -1), (1, 2)]
-
-        if is_valid_move(self, grid, new_shape=new_shape):
-            self.shape = new_shape
-            return True
-        else:
-            # Try wall kicks
-            for dx, dy in kick_tests:
-                self.x = original_x + dx
-                self.y = original_y + dy
-                if is_valid_move(self, grid, new_shape=new_shape):
-                    self.shape = new_shape
-                    return True
-                self.x, self.y = original_x, original_y
-            self.shape = original_shape
-            return False
+        target = (self.rotation + (1 if clockwise else 3)) % 4
+        new_state = PIECES[self.shape_index][target]
+        for dx, dy in KICKS[self.shape_index][self.rotation][target]:
+            if not grid.collides(new_state.masks, self.x + dx, self.y + dy):
+                self.x += dx
+                self.y += dy
+                self.rotation = target
+                self.state = new_state
+                return True
+        return False
 
     def get_shape(self):
         """Return current block shape"""
-        return self.shape
-
-def create_blocks_bag():
+        return self.state.shape
+
+class Session:
+    """Per-game rules state: the 7-bag, back-to-back/all-clear flags and animations"""
+    def __init__(self, seed=None):
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+        self.reset_session()
+
+    def reset_session(self):
+        # Game state tracking
+        self.current_bag = []
+        self.bag_count = 0
+        self.back_to_back = self.all_clear = False
+        # Game clock (ms) and the messages shown until a time on it
+        self.now = 0
+        self.animations = animations.Animations()
+
+    def announce(self, slot, text, duration):
+        """Show text in an animations slot for duration milliseconds of game time"""
+        self.animations.show(slot, text, self.now + duration)
+
+def create_blocks_bag(rng=random):
     """Create a new shuffled bag of all 7 tetromino types"""
-    bag = list(range(len(design.SHAPES)))
-    random.shuffle(bag)
+    bag = list(range(len(SHAPES)))
+    rng.shuffle(bag)
     return bag
 
-def create_block():
+def next_bag(session):
+    """Draw the session's next bag. Each bag depends only on the seed and its
+    number, so a saved bag_count is enough to resume the sequence."""
+    bag = create_blocks_bag(random.Random(session.seed << 24 | session.bag_count))
+    session.bag_count += 1
+    return bag
+
+def create_block(session):
     """Create a new block using the 7-bag randomizer system"""
-    global current_bag
-    if not current_bag:
-        current_bag = create_blocks_bag()
-    shape_index = current_bag.pop(0)
+    if not session.current_bag:
+        session.current_bag = next_bag(session)
+    shape_index = session.current_bag.pop(0)
     return Block(shape_index)
 
 def is_valid_move(block, grid, dx=0, dy=0, new_shape=None):
     """Check if a move is valid with debug info and top overflow detection"""
-    shape = new_shape if new_shape else block.get_shape()
-    for y, row in enumerate(shape):
-        for x, cell in enumerate(row):
-            if cell:
-                new_x, new_y = block.x + x + dx, block.y + y + dy
-                if (new_x < 0 or new_x >= design.GRID_WIDTH or 
-                    new_y < 0 or new_y >= design.GRID_HEIGHT or
-                    (new_y >= 0 and grid[new_y][new_x] != design.TRANSPARENT)):
-                    return False
-    return True
+    masks = shape_masks(new_shape) if new_shape else block.masks
+    return not grid.collides(masks, block.x + dx, block.y + dy)
 
 def place_block(block, grid):
     """Place block in the grid"""
-    shape = block.get_shape()
-    for y, row in enumerate(shape):
-        for x, cell in enumerate(row):
-            if cell:
-                grid[block.y + y][block.x + x] = block.color
+    grid.place(block.masks, block.x, block.y, block.shape_index)
+
+def calculate_fall_speed(level):
+    """Calculate gravity interval in milliseconds per row for a level"""
+    return BASE_FALL_SPEED * max(0.1, 1.0 - ((level - 1) * 0.15))
 
 def calculate_soft_drop_score(drop_distance):
     """Calculate points for soft drop"""
@@ -95,28 +100,19 @@ def calculate_hard_drop_score(current_y, landing_y):
     """Calculate points for hard drop"""
     return 2 * (landing_y - current_y)
 
-def clear_lines(grid):
+def clear_lines(session, grid):
     """Clear completed lines and return score"""
-    global score_animation, score_timer, clear_message
-    lines_cleared = 0
-
-    for y in range(design.GRID_HEIGHT):
-        if all(cell != design.TRANSPARENT for cell in grid[y]):
-            del grid[y]
-            grid.insert(0, [design.TRANSPARENT for _ in range(design.GRID_WIDTH)])
-            lines_cleared += 1
+    lines_cleared = grid.clear_rows(grid.full_rows())
 
     messages = {1: "Single", 2: "Double", 3: "Triple", 4: "Tetris"}
     if lines_cleared > 0:
-        score_animation = f"+{SCORES.get(lines_cleared, 0)}"
-        clear_message = messages.get(lines_cleared, "")
-        score_timer = 200
+        session.announce(animations.SCORE, f"+{SCORES.get(lines_cleared, 0)}", 3333)
+        session.announce(animations.MESSAGE, messages.get(lines_cleared, ""), 3333)
 
     return lines_cleared, SCORES.get(lines_cleared, 0)
 
-def update_combo(combo_count, lines_cleared, grid):
+def update_combo(session, combo_count, lines_cleared, grid):
     """Update combo count and calculate bonuses"""
-    global combo_animation, combo_timer, back_to_back, all_clear, clear_message
 
     if lines_cleared == 0:
         return 0, 0  
@@ -128,76 +124,55 @@ def update_combo(combo_count, lines_cleared, grid):
         bonus_index = min(combo_count, len(COMBO_BONUS) - 1)
         combo_bonus = COMBO_BONUS[bonus_index]
         total_bonus += combo_bonus
-        combo_animation = f"COMBO x{combo_count}! +{combo_bonus}"
-        combo_timer = 200
+        session.announce(animations.COMBO, f"COMBO x{combo_count}! +{combo_bonus}", 3333)
 
     if lines_cleared == 4:
-        if back_to_back:
+        if session.back_to_back:
             b2b_bonus = int(SCORES[4] * (BACK_TO_BACK_BONUS - 1))
             total_bonus += b2b_bonus
-            clear_message = "BACK-TO-BACK TETRIS!"
-        back_to_back = True
+            session.announce(animations.MESSAGE, "BACK-TO-BACK TETRIS!", 3333)
+        session.back_to_back = True
     else:
-        back_to_back = False
+        session.back_to_back = False
 
-    if all(all(cell == design.TRANSPARENT for cell in row) for row in grid):
+    if grid.is_empty():
         total_bonus += ALL_CLEAR_BONUS
-        score_animation = f"+{ALL_CLEAR_BONUS}"
-        score_timer = 300
-        clear_message = "PERFECT CLEAR!"
-        all_clear = True
+        session.announce(animations.SCORE, f"+{ALL_CLEAR_BONUS}", 5000)
+        session.announce(animations.MESSAGE, "PERFECT CLEAR!", 5000)
+        session.all_clear = True
     else:
-        all_clear = False
+        session.all_clear = False
 
     return combo_count, total_bonus
 
-def get_ghost_piece(block, grid):
-    """Create a ghost piece showing where the block will land"""
+def landing_y(block, grid):
+    """Row the block would land on if dropped straight down"""
+    return block.y + grid.drop_distance(block.state.bottoms, block.x, block.y)
+
+def get_ghost_piece(block, grid, ghost_block=None):
+    """Create a ghost piece showing where the block will land (reusing ghost_block if given)"""
     if not block:
         return None
 
-    ghost_block = Block(block.shape_index)
-    ghost_block.shape = [row[:] for row in block.shape]
-    ghost_block.x, ghost_block.y = block.x, block.y
-    ghost_block.color = tuple(min(255, c + 50) for c in block.color)
-
-    while is_valid_move(ghost_block, grid, dy=1):
-        ghost_block.y += 1
-
+    if ghost_block is None:
+        ghost_block = Block(block.shape_index, block.rotation)
+    ghost_block.shape_index, ghost_block.rotation = block.shape_index, block.rotation
+    ghost_block.state = block.state
+    ghost_block.color = GHOST_COLORS[block.shape_index]
+    ghost_block.x, ghost_block.y = block.x, landing_y(block, grid)
     return ghost_block
 
+def high_score_store():
+    """The shared HighScoreStore, imported on first use so the rules stay free of sqlite and threads"""
+    import highscores
+    return highscores.store
+
 def load_high_scores():
-    """Load high scores from file with compatibility for old format"""
-    if not os.path.exists(HIGH_SCORE_FILE):
-        return []
-    
-    with open(HIGH_SCORE_FILE, "r") as file:
-        try:
-            data = json.load(file)
-            if not data:
-                return []
-            if all(isinstance(item, (int, float)) for item in data):
-                return [{"score": int(item), "name": "AAA", "date": "2025-03-09"} for item in data]
-            return data if isinstance(data, list) else []
-        except json.JSONDecodeError:
-            return []
-
-def save_high_scores(high_scores):
-    """Save high scores to file"""
-    if not high_scores:
-        high_scores = []
-    
-    try:
-        with open(HIGH_SCORE_FILE, "w") as file:
-            json.dump(high_scores, file, indent=4)
-        print(f"Successfully saved high scores to {os.path.abspath(HIGH_SCORE_FILE)}")
-    except Exception as e:
-        print(f"Error saving high scores: {e}")
-
-def update_high_scores(new_score, player_name=None):
-    """Update high score list with name"""
-    import datetime
-    high_scores = load_high_scores()
+    """Load the high score table (served from memory)"""
+    return high_score_store().load()
+
+def update_high_scores(new_score, player_name=None, start_level=1, lines=0):
+    """Record a named game and return whether it makes the high score table"""
     if not isinstance(new_score, int):
         return False
 
@@ -205,49 +180,42 @@ def update_high_scores(new_score, player_name=None):
     if player_name is None or player_name.strip() == "":
         return True
 
-    # Check is new entry in high scores
-    for entry in high_scores:
-        if "is_new" in entry:
-            entry["is_new"] = False
-
-    if len(high_scores) < MAX_SCORES or new_score > min(high_scores, key=lambda x: x["score"], default={"score": 0})["score"]:
-        entry = {
-            "score": new_score,
-            "name": player_name,
-            "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
-            "is_new": True  # Mark latest entry as new
-        }
-        high_scores.append(entry)
-        high_scores = sorted(high_scores, key=lambda x: x["score"], reverse=True)[:MAX_SCORES]
-        save_high_scores(high_scores)
-        return True
-    return False
-
-def reset_game(initial_level=1, keep_lines_cleared=False, current_lines_cleared=0):
-    global current_bag
-    current_bag = create_blocks_bag()
-    current_block = create_block()
-    next_blocks = [create_block() for _ in range(3)]
+    high_scores = load_high_scores()
+    qualifies = len(high_scores) < MAX_SCORES or new_score > min(high_scores, key=lambda x: x["score"], default={"score": 0})["score"]
+    high_score_store().record(player_name, new_score, start_level, lines=lines)
+    return qualifies
+
+def reset_game(session, initial_level=1, keep_lines_cleared=False, current_lines_cleared=0):
+    session.reset_session()
+    session.current_bag = next_bag(session)
+    current_block = create_block(session)
+    next_blocks = [create_block(session) for _ in range(3)]
     hold_block = None
     hold_used = False
-    grid = [[design.TRANSPARENT for _ in range(design.GRID_WIDTH)] for _ in range(design.GRID_HEIGHT)]
+    grid = Board()
     score = combo_count = 0
     lines_cleared = current_lines_cleared if keep_lines_cleared else 0
     return current_block, next_blocks, hold_block, hold_used, grid, score, combo_count, lines_cleared, initial_level
 
-def end_game(score, player_name=None):
-    """Handle game over with optional player name"""
-    if player_name and player_name.strip():
-        update_high_scores(score, player_name)
-    else:
-        print("No valid player name provided, score not saved.")
+def end_game(score, player_name=None, start_level=1, lines=0):
+    """Handle game over: every game is recorded, only named ones are ranked. Returns the recorded game"""
+    name = player_name if player_name and player_name.strip() else ""
+    return high_score_store().record(name, score, start_level, lines=lines)
+
+def name_game(game, player_name):
+    """Give a game recorded by end_game() a player name so it is ranked"""
+    if player_name is None or player_name.strip() == "":
+        print("No valid player name provided, score not ranked.")
+        return
+    high_score_store().rename(game, player_name)
 
 def check_for_tspin(block, grid, last_action_was_rotation):
     # Check tspin mechanics
     if block.shape_index != 6 or not last_action_was_rotation:
         return False
     
-    center_x, center_y = block.x + 1, block.y + 1
+    pivot_x, pivot_y = block.state.pivot
+    center_x, center_y = block.x + pivot_x, block.y + pivot_y
     corners = [
         (center_x - 1, center_y - 1), (center_x + 1, center_y - 1),
         (center_x - 1, center_y + 1), (center_x + 1, center_y + 1)
@@ -255,8 +223,8 @@ def check_for_tspin(block, grid, last_action_was_rotation):
     
     filled_corners = 0
     for x, y in corners:
-        if (x < 0 or x >= len(grid[0]) or y >= len(grid) or
-            (0 <= y < len(grid) and 0 <= x < len(grid[0]) and grid[y][x] != design.TRANSPARENT)):
+        if (x < 0 or x >= grid.width or y >= grid.height or
+            (0 <= y < grid.height and grid.cell(x, y))):
             filled_corners += 1
     
     return filled_corners >= 3
\ No newline at end of file
@@ -0,0 +1,129 @@
+'''highscores.py - In-memory high score table with write-behind persistence'''
+import atexit
+import datetime
+import os
+import threading
+import leaderboard
+from constants import *
+
+
+class HighScoreStore:
+    """Top-N high score table served from memory over the SQLite leaderboard.
+
+    The table comes from one indexed query and is only re-queried when the
+    database changes (PRAGMA data_version). record() updates the in-memory
+    table immediately and queues the insert for a background writer, so the
+    game thread never waits on the disk. A game recorded without a name can
+    be named later with rename(), which queues an update of the same row.
+    An existing highscores.json is imported the first time the leaderboard
+    is opened empty.
+    """
+    def __init__(self, path=LEADERBOARD_FILE, legacy_path=HIGH_SCORE_FILE, limit=MAX_SCORES):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.limit = limit
+        self.board = None
+        self.scores = []
+        self.version = None
+        self.last_id = None
+        self.pending = []
+        self.condition = threading.Condition()
+        self.writer = None
+
+    def open(self):
+        if self.board is None:
+            self.board = leaderboard.Leaderboard(self.path)
+            if self.board.count() == 0 and self.legacy_path and os.path.exists(self.legacy_path):
+                imported = self.board.import_json(self.legacy_path)
+                print(f"Imported {imported} high scores from {self.legacy_path}")
+        return self.board
+
+    def load(self):
+        """Return the cached top-N table, re-querying only when the database changed"""
+        with self.condition:
+            if self.pending:
+                return self.scores
+            board = self.open()
+            version = board.data_version()
+            if version != self.version:
+                self.scores = board.top(self.limit)
+                self.version = version
+                for entry in self.scores:
+                    entry["is_new"] = entry["id"] == self.last_id
+            return self.scores
+
+    def record(self, name, score, start_level=1, mode=DEFAULT_MODE, lines=0):
+        """Record a completed game: update the table now, write it in the background.
+
+        Returns the game, which can be passed to rename().
+        """
+        entry = {
+            "score": score,
+            "name": name,
+            "start_level": start_level,
+            "mode": mode,
+            "lines": lines,
+            "date": datetime.datetime.now().strftime(leaderboard.DATE_FORMAT),
+        }
+        with self.condition:
+            for old in self.scores:
+                old["is_new"] = False
+            if name:
+                shown = dict(entry, date=entry["date"][:16], is_new=True)
+                self.scores = sorted(self.scores + [shown], key=lambda x: x["score"], reverse=True)[:self.limit]
+            self._queue(entry)
+        return entry
+
+    def rename(self, game, name):
+        """Name a game recorded by record(): rank it now, update its row in the background"""
+        with self.condition:
+            for old in self.scores:
+                old["is_new"] = False
+            shown = dict(game, name=name, date=game["date"][:16], is_new=True)
+            self.scores = sorted(self.scores + [shown], key=lambda x: x["score"], reverse=True)[:self.limit]
+            self._queue({"game": game, "name": name})
+
+    def _queue(self, entry):
+        self.pending.append(entry)
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write_loop, name="highscore-writer", daemon=True)
+            self.writer.start()
+        self.condition.notify()
+
+    def flush(self):
+        """Block until every queued game has been written"""
+        with self.condition:
+            while self.pending:
+                self.condition.wait()
+
+    def _write_loop(self):
+        board = leaderboard.Leaderboard(self.path)
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                entry = self.pending[0]
+            try:
+                if "game" in entry:
+                    game_id = entry["game"].get("id")
+                    if game_id is None:
+                        raise ValueError("the game to rename was not saved")
+                    board.rename_game(game_id, entry["name"])
+                else:
+                    game_id = board.record_game(entry["name"], entry["score"], entry["start_level"],
+                                                entry["mode"], entry["lines"], entry["date"])
+            except Exception as e:
+                game_id = None
+                print(f"Error saving high score: {e}")
+            with self.condition:
+                self.pending.pop(0)
+                if game_id is not None:
+                    if "game" not in entry:
+                        entry["id"] = game_id
+                    if entry["name"]:
+                        self.last_id = game_id
+                self.condition.notify_all()
+
+
+store = HighScoreStore()
+atexit.register(store.flush)
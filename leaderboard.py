@@ -0,0 +1,135 @@
+'''leaderboard.py - SQLite leaderboard keeping every completed game'''
+import datetime
+import json
+import sqlite3
+from constants import *
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    start_level INTEGER NOT NULL DEFAULT 1,
+    mode TEXT NOT NULL DEFAULT 'marathon',
+    lines INTEGER NOT NULL DEFAULT 0,
+    played_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_score_date ON games (score DESC, id, played_at, name);
+CREATE INDEX IF NOT EXISTS games_by_level ON games (start_level, score DESC);
+CREATE INDEX IF NOT EXISTS games_by_mode ON games (mode, score DESC);
+CREATE INDEX IF NOT EXISTS games_by_player ON games (name, score DESC);
+CREATE INDEX IF NOT EXISTS games_by_date_score ON games (played_at, score, name);
+"""
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# A date range with fewer games than this is read from games_by_date_score and sorted;
+# wider ranges walk games_by_score_date best first and stop once limit games matched
+DATE_SCAN_LIMIT = 2000
+
+
+def parse_high_scores(data):
+    """Normalise highscores.json data, migrating the old plain list of integer scores"""
+    if not data:
+        return []
+    if all(isinstance(item, (int, float)) for item in data):
+        return [{"score": int(item), "name": "AAA", "date": "2025-03-09"} for item in data]
+    return data if isinstance(data, list) else []
+
+
+def normalise_date(date):
+    """Convert the dates found in highscores.json to DATE_FORMAT"""
+    for date_format in (DATE_FORMAT, "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(str(date), date_format).strftime(DATE_FORMAT)
+        except ValueError:
+            pass
+    return "1970-01-01 00:00:00"
+
+
+class Leaderboard:
+    """Every completed game in one indexed SQLite table (WAL mode).
+
+    Dates are stored as "YYYY-MM-DD HH:MM:SS" text so they sort and compare
+    chronologically. Games recorded without a name are kept but are left
+    out of the ranked queries.
+    """
+    def __init__(self, path=LEADERBOARD_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def data_version(self):
+        """Changes whenever another connection commits to the database"""
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def record_game(self, name, score, start_level=1, mode=DEFAULT_MODE, lines=0, played_at=None):
+        """Insert one completed game and return its id"""
+        played_at = played_at or datetime.datetime.now().strftime(DATE_FORMAT)
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO games (name, score, start_level, mode, lines, played_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, score, start_level, mode, lines, played_at))
+        return cursor.lastrowid
+
+    def rename_game(self, game_id, name):
+        """Set the player name of a recorded game"""
+        with self.connection:
+            self.connection.execute("UPDATE games SET name = ? WHERE id = ?", (name, game_id))
+
+    def top(self, limit=MAX_SCORES, start_level=None, mode=None, name=None, since=None, until=None):
+        """Return the best named games, optionally filtered by level, mode, player and date range"""
+        clauses, params = ["name != ''"], []
+        for column, value in (("start_level", start_level), ("mode", mode), ("name", name)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        date_clauses, date_params = [], []
+        if since is not None:
+            date_clauses.append("played_at >= ?")
+            date_params.append(since)
+        if until is not None:
+            date_clauses.append("played_at < ?")
+            date_params.append(until)
+        index = ""
+        if date_clauses:
+            index = f"INDEXED BY {self.date_index(date_clauses, date_params)}"
+        rows = self.connection.execute(
+            f"SELECT id, name, score, start_level, mode, lines, played_at FROM games {index} "
+            f"WHERE {' AND '.join(clauses + date_clauses)} ORDER BY score DESC, id LIMIT ?",
+            params + date_params + [limit])
+        return [{"id": row[0], "name": row[1], "score": row[2], "start_level": row[3], "mode": row[4],
+                 "lines": row[5], "date": row[6][:16]} for row in rows]
+
+    def date_index(self, date_clauses, date_params):
+        """Pick the index for a date range query.
+
+        SQLite cannot tell how many games a range holds, and reading a wide
+        range through the date index means sorting most of the table. So
+        the games in the range are counted, up to DATE_SCAN_LIMIT, first.
+        """
+        count = self.connection.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM games INDEXED BY games_by_date_score "
+            f"WHERE {' AND '.join(date_clauses)} LIMIT ?)", date_params + [DATE_SCAN_LIMIT]).fetchone()[0]
+        return "games_by_date_score" if count < DATE_SCAN_LIMIT else "games_by_score_date"
+
+    def import_json(self, path=HIGH_SCORE_FILE):
+        """Import a highscores.json file (either format) and return the number of games added"""
+        with open(path, "r") as file:
+            try:
+                entries = parse_high_scores(json.load(file))
+            except json.JSONDecodeError:
+                return 0
+        rows = [(entry.get("name") or "AAA", int(entry.get("score", 0)), normalise_date(entry.get("date")))
+                for entry in entries]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO games (name, score, played_at) VALUES (?, ?, ?)", rows)
+        return len(rows)
@@ -1,20 +1,23 @@
 '''menu.py - Handling the start menu and game over screen.'''
 import pygame
+import fonts
 import gameplay
 from constants import *
 
-# Initialize fonts
-font = small_font = large_font = screen = None
+# Font keys (face, size, bold) resolved through the shared font registry
+FONT = ("couriernew", 24, False)
+SMALL_FONT = ("couriernew", 24, True)
+LARGE_FONT = ("couriernew", 48, False)
+TITLE_FONT = (None, 72, True)
+
+screen = None
 current_level_index = 0
 
 def create_screen():
     """Create and return the game window"""
-    global screen, font, small_font, large_font
+    global screen
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Tetris")
-    font = pygame.font.SysFont("couriernew", 24)
-    small_font = pygame.font.SysFont("couriernew", 24, bold=True)
-    large_font = pygame.font.SysFont("couriernew", 48)
     return screen
 
 def get_rainbow_color(time):
@@ -35,9 +38,6 @@ def draw_start_menu(screen):
     global current_level_index
     screen.fill(BACKGROUND_COLOR)
 
-    # Tetris title
-    title_font = pygame.font.SysFont(None, 72, bold=True)
-    
     # Tetris title letters and colors
     letters = "TETRIS"
     colors = [
@@ -49,23 +49,17 @@ def draw_start_menu(screen):
         (138, 43, 226)  # S - Purple
     ]
     
-    total_width = 0
-    letter_surfaces = []
-    
-    for letter in letters:
-        letter_surface = title_font.render(letter, True, WHITE)
-        letter_surfaces.append(letter_surface)
-        total_width += letter_surface.get_width()
+    letter_surfaces = [fonts.render(TITLE_FONT, letter, color) for letter, color in zip(letters, colors)]
+    total_width = sum(letter_surface.get_width() for letter_surface in letter_surfaces)
     
     current_x = SCREEN_WIDTH // 2 - total_width // 2
     title_y = 100
     
     # Render each letter with a shadow
-    for i, letter_surface in enumerate(letter_surfaces):
-        color_letter = title_font.render(letters[i], True, colors[i])
-        shadow_letter = title_font.render(letters[i], True, (50, 50, 50))
+    for letter, letter_surface in zip(letters, letter_surfaces):
+        shadow_letter = fonts.render(TITLE_FONT, letter, (50, 50, 50))
         screen.blit(shadow_letter, (current_x + 3, title_y + 3))
-        screen.blit(color_letter, (current_x, title_y))
+        screen.blit(letter_surface, (current_x, title_y))
         current_x += letter_surface.get_width()
 
     # Mouse position
@@ -79,7 +73,7 @@ def draw_start_menu(screen):
     button_color = BUTTON_HOVER_COLOR if play_rect.collidepoint(mouse_pos) else BUTTON_COLOR
     pygame.draw.rect(screen, button_color, play_rect)
     pygame.draw.rect(screen, WHITE, play_rect, 2)
-    play_text = font.render("PLAY", True, WHITE)
+    play_text = fonts.render(FONT, "PLAY", WHITE)
     screen.blit(play_text, (button_x + button_width // 2 - play_text.get_width() // 2, 
                             button_y + button_height // 2 - play_text.get_height() // 2))
 
@@ -92,20 +86,20 @@ def draw_start_menu(screen):
     pygame.draw.rect(screen, level_button_color, level_rect)
     pygame.draw.rect(screen, WHITE, level_rect, 2)
     current_level = LEVEL_OPTIONS[current_level_index]
-    level_text = font.render(f"LEVEL: {current_level}", True, WHITE)
+    level_text = fonts.render(FONT, f"LEVEL: {current_level}", WHITE)
     screen.blit(level_text, (level_button_x + level_button_width // 2 - level_text.get_width() // 2, 
                             level_button_y + level_button_height // 2 - level_text.get_height() // 2))
 
     # High Scores
-    high_score_text = small_font.render("HIGH SCORES", True, WHITE)
+    high_score_text = fonts.render(SMALL_FONT, "HIGH SCORES", WHITE)
     screen.blit(high_score_text, (SCREEN_WIDTH // 2 - high_score_text.get_width() // 2, level_button_y + level_button_height + 30))
 
     # Load high scores file
     high_scores = gameplay.load_high_scores()
     
-    max_rank_width = max([small_font.render(f"{i + 1}.", True, WHITE).get_width() for i in range(len(high_scores))] or [small_font.render("5.", True, WHITE).get_width()])
-    max_name_width = max([small_font.render(entry["name"], True, WHITE).get_width() for entry in high_scores] or [small_font.render("AAA", True, WHITE).get_width()])
-    max_score_width = max([small_font.render(f"{entry['score']:,}", True, WHITE).get_width() for entry in high_scores] or [small_font.render("0,000", True, WHITE).get_width()])
+    max_rank_width = max([fonts.render(SMALL_FONT, f"{i + 1}.", WHITE).get_width() for i in range(len(high_scores))] or [fonts.render(SMALL_FONT, "5.", WHITE).get_width()])
+    max_name_width = max([fonts.render(SMALL_FONT, entry["name"], WHITE).get_width() for entry in high_scores] or [fonts.render(SMALL_FONT, "AAA", WHITE).get_width()])
+    max_score_width = max([fonts.render(SMALL_FONT, f"{entry['score']:,}", WHITE).get_width() for entry in high_scores] or [fonts.render(SMALL_FONT, "0,000", WHITE).get_width()])
     
     RANK_WIDTH = max(60, max_rank_width + 15)
     NAME_WIDTH = max(120, max_name_width + 20)
@@ -122,9 +116,12 @@ def draw_start_menu(screen):
     header_rect = pygame.Rect(table_x, table_y, table_width, table_height)
     pygame.draw.rect(screen, TABLE_COLOR, header_rect)
     pygame.draw.rect(screen, WHITE, header_rect, 1)
-    screen.blit(small_font.render("RANK", True, WHITE), (table_x + (RANK_WIDTH - small_font.render("RANK", True, WHITE).get_width()) // 2, table_y + table_height//2 - small_font.get_height()//2))
-    screen.blit(small_font.render("NAME", True, WHITE), (name_x + (NAME_WIDTH - small_font.render("NAME", True, WHITE).get_width()) // 2, table_y + table_height//2 - small_font.get_height()//2))
-    screen.blit(small_font.render("SCORE", True, WHITE), (score_x + (SCORE_WIDTH - small_font.render("SCORE", True, WHITE).get_width()) // 2, table_y + table_height//2 - small_font.get_height()//2))
+    header_text = fonts.render(SMALL_FONT, "RANK", WHITE)
+    screen.blit(header_text, (table_x + (RANK_WIDTH - header_text.get_width()) // 2, table_y + table_height//2 - header_text.get_height()//2))
+    header_text = fonts.render(SMALL_FONT, "NAME", WHITE)
+    screen.blit(header_text, (name_x + (NAME_WIDTH - header_text.get_width()) // 2, table_y + table_height//2 - header_text.get_height()//2))
+    header_text = fonts.render(SMALL_FONT, "SCORE", WHITE)
+    screen.blit(header_text, (score_x + (SCORE_WIDTH - header_text.get_width()) // 2, table_y + table_height//2 - header_text.get_height()//2))
     
     # Table rows
     for i, entry in enumerate(high_scores[:gameplay.MAX_SCORES]):
@@ -133,9 +130,9 @@ def draw_start_menu(screen):
         row_color = (30, 30, 50) if i % 2 == 0 else (20, 20, 40)
         pygame.draw.rect(screen, row_color, row_rect)
         pygame.draw.rect(screen, WHITE, row_rect, 1)
-        rank_num = small_font.render(f"{i + 1}.", True, WHITE)
-        name_num = small_font.render(entry["name"], True, WHITE)
-        score_num = small_font.render(f"{entry['score']:,}", True, WHITE)
+        rank_num = fonts.render(SMALL_FONT, f"{i + 1}.", WHITE)
+        name_num = fonts.render(SMALL_FONT, entry["name"], WHITE)
+        score_num = fonts.render(SMALL_FONT, f"{entry['score']:,}", WHITE)
         screen.blit(rank_num, (table_x + (RANK_WIDTH - rank_num.get_width()) // 2, row_y + table_height//2 - rank_num.get_height()//2))
         screen.blit(name_num, (name_x + (NAME_WIDTH - name_num.get_width()) // 2, row_y + table_height//2 - name_num.get_height()//2))
         screen.blit(score_num, (score_x + (SCORE_WIDTH - score_num.get_width()) // 2, row_y + table_height//2 - score_num.get_height()//2))
@@ -154,19 +151,19 @@ def draw_game_over(screen, score, new_high_score, input_active, input_text, flas
     overlay.fill((0, 0, 0, 180))
     screen.blit(overlay, (0, 0))
     
-    game_over_text = large_font.render("GAME OVER", True, WHITE)
+    game_over_text = fonts.render(LARGE_FONT, "GAME OVER", WHITE)
     screen.blit(game_over_text, (SCREEN_WIDTH // 2 - game_over_text.get_width() // 2, SCREEN_HEIGHT // 3 - 50))
     
-    final_score_text = font.render(f"Final Score: {score:,}", True, WHITE)
+    final_score_text = fonts.render(FONT, f"Final Score: {score:,}", WHITE)
     screen.blit(final_score_text, (SCREEN_WIDTH // 2 - final_score_text.get_width() // 2, SCREEN_HEIGHT // 3 + 10))
 
     high_scores = gameplay.load_high_scores()
-    high_score_title = small_font.render("HIGH SCORES", True, WHITE)
+    high_score_title = fonts.render(SMALL_FONT, "HIGH SCORES", WHITE)
     screen.blit(high_score_title, (SCREEN_WIDTH // 2 - high_score_title.get_width() // 2, SCREEN_HEIGHT // 3 + 50))
 
-    max_rank_width = max([small_font.render(f"{i + 1}.", True, WHITE).get_width() for i in range(len(high_scores))] or [small_font.render("5.", True, WHITE).get_width()])
-    max_name_width = max([small_font.render(entry["name"], True, WHITE).get_width() for entry in high_scores] or [small_font.render("AAA", True, WHITE).get_width()])
-    max_score_width = max([small_font.render(f"{entry['score']:,}", True, WHITE).get_width() for entry in high_scores] or [small_font.render("0,000", True, WHITE).get_width()])
+    max_rank_width = max([fonts.render(SMALL_FONT, f"{i + 1}.", WHITE).get_width() for i in range(len(high_scores))] or [fonts.render(SMALL_FONT, "5.", WHITE).get_width()])
+    max_name_width = max([fonts.render(SMALL_FONT, entry["name"], WHITE).get_width() for entry in high_scores] or [fonts.render(SMALL_FONT, "AAA", WHITE).get_width()])
+    max_score_width = max([fonts.render(SMALL_FONT, f"{entry['score']:,}", WHITE).get_width() for entry in high_scores] or [fonts.render(SMALL_FONT, "0,000", WHITE).get_width()])
     
     RANK_WIDTH = max(60, max_rank_width + 15)
     NAME_WIDTH = max(120, max_name_width + 20)
@@ -182,9 +179,12 @@ def draw_game_over(screen, score, new_high_score, input_active, input_text, flas
     header_rect = pygame.Rect(table_x, table_y, table_width, table_height)
     pygame.draw.rect(screen, TABLE_COLOR, header_rect)
     pygame.draw.rect(screen, WHITE, header_rect, 1)
-    screen.blit(small_font.render("RANK", True, WHITE), (table_x + (RANK_WIDTH - small_font.render("RANK", True, WHITE).get_width()) // 2, table_y + table_height//2 - small_font.get_height()//2))
-    screen.blit(small_font.render("NAME", True, WHITE), (name_x + (NAME_WIDTH - small_font.render("NAME", True, WHITE).get_width()) // 2, table_y + table_height//2 - small_font.get_height()//2))
-    screen.blit(small_font.render("SCORE", True, WHITE), (score_x + (SCORE_WIDTH - small_font.render("SCORE", True, WHITE).get_width()) // 2, table_y + table_height//2 - small_font.get_height()//2))
+    header_text = fonts.render(SMALL_FONT, "RANK", WHITE)
+    screen.blit(header_text, (table_x + (RANK_WIDTH - header_text.get_width()) // 2, table_y + table_height//2 - header_text.get_height()//2))
+    header_text = fonts.render(SMALL_FONT, "NAME", WHITE)
+    screen.blit(header_text, (name_x + (NAME_WIDTH - header_text.get_width()) // 2, table_y + table_height//2 - header_text.get_height()//2))
+    header_text = fonts.render(SMALL_FONT, "SCORE", WHITE)
+    screen.blit(header_text, (score_x + (SCORE_WIDTH - header_text.get_width()) // 2, table_y + table_height//2 - header_text.get_height()//2))
 
     current_time = pygame.time.get_ticks()
     for i, entry in enumerate(high_scores[:gameplay.MAX_SCORES]):
@@ -194,12 +194,12 @@ def draw_game_over(screen, score, new_high_score, input_active, input_text, flas
         pygame.draw.rect(screen, row_color, row_rect)
         pygame.draw.rect(screen, WHITE, row_rect, 1)
         
-        rank_text = small_font.render(f"{i + 1}.", True, WHITE)
+        rank_text = fonts.render(SMALL_FONT, f"{i + 1}.", WHITE)
         # Only flash the latest high score entry
         is_new_entry = entry.get("is_new", False)
         text_color = get_rainbow_color(current_time) if (new_high_score and is_new_entry and not input_active and current_time - flash_start_time < 5000) else WHITE
-        name_text = small_font.render(entry["name"], True, text_color)
-        score_text = small_font.render(f"{entry['score']:,}", True, text_color)
+        name_text = fonts.render(SMALL_FONT, entry["name"], text_color)
+        score_text = fonts.render(SMALL_FONT, f"{entry['score']:,}", text_color)
         
         screen.blit(rank_text, (table_x + (RANK_WIDTH - rank_text.get_width()) // 2, row_y + table_height//2 - rank_text.get_height()//2))
         screen.blit(name_text, (name_x + (NAME_WIDTH - name_text.get_width()) // 2, row_y + table_height//2 - name_text.get_height()//2))
@@ -213,10 +213,10 @@ def draw_game_over(screen, score, new_high_score, input_active, input_text, flas
         pygame.draw.rect(screen, input_box_color, input_box)
         pygame.draw.rect(screen, WHITE, input_box, 2)
         
-        prompt_text = small_font.render("Enter your name (max 5 chars)", True, WHITE)
+        prompt_text = fonts.render(SMALL_FONT, "Enter your name (max 5 chars)", WHITE)
         screen.blit(prompt_text, (SCREEN_WIDTH // 2 - prompt_text.get_width() // 2, input_box_y - 30))
         
-        input_display = small_font.render(input_text, True, WHITE)
+        input_display = fonts.render(SMALL_FONT, input_text, WHITE)
         screen.blit(input_display, (input_box.x + 10, input_box.y + input_box.h // 2 - input_display.get_height() // 2))
         
         cursor_visible = (pygame.time.get_ticks() // 500) % 2 == 0
@@ -232,20 +232,27 @@ def draw_game_over(screen, score, new_high_score, input_active, input_text, flas
     button_color = BUTTON_HOVER_COLOR if button_rect.collidepoint(pygame.mouse.get_pos()) else BUTTON_COLOR
     pygame.draw.rect(screen, button_color, button_rect)
     pygame.draw.rect(screen, WHITE, button_rect, 2)
-    button_text = font.render("RESTART", True, WHITE)
+    button_text = fonts.render(FONT, "RESTART", WHITE)
     screen.blit(button_text, (button_x + button_width // 2 - button_text.get_width() // 2, 
                             button_y + button_height // 2 - button_text.get_height() // 2))
 
     return button_rect
 
-def draw_countdown(screen, font, count):
-    """Draw the countdown timer on the screen"""
-    screen.fill(BACKGROUND_COLOR)  # Clear the screen
-    text = font.render(str(count), True, WHITE)
+def draw_countdown(screen, font, count, last_rect=None):
+    """Draw the countdown digit and return its rect.
+
+    Only last_rect (the previous digit) is cleared when given, otherwise the whole screen.
+    """
+    if last_rect is None:
+        screen.fill(BACKGROUND_COLOR)
+    else:
+        screen.fill(BACKGROUND_COLOR, last_rect)
+    text = fonts.render(font, str(count), WHITE)
     text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
     screen.blit(text, text_rect)
+    return text_rect
 
-def handle_game_over_input(events, input_text, score):
+def handle_game_over_input(events, input_text, game):
     """Game over input handling including high score entry"""
     input_active = True
     for event in events:
@@ -258,7 +265,7 @@ def handle_game_over_input(events, input_text, score):
             if event.key in (pygame.K_LALT, pygame.K_RALT):
                 continue
             if event.key == pygame.K_RETURN and input_text.strip():
-                gameplay.end_game(score, input_text)
+                gameplay.name_game(game, input_text)
                 input_active = False
             elif event.key == pygame.K_BACKSPACE and len(input_text) > 0:
                 input_text = input_text[:-1]
@@ -0,0 +1,83 @@
+'''pieces.py - Precomputed rotation states and SRS wall kick tables'''
+from board import shape_masks
+from constants import *
+
+# SRS kick offsets as (x, y) with y pointing up, keyed by (from, to) rotation.
+# Rotation states are 0 = spawn, 1 = R (clockwise), 2 = 180, 3 = L.
+JLSTZ_KICKS = {
+    (0, 1): ((0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)),
+    (1, 0): ((0, 0), (1, 0), (1, -1), (0, 2), (1, 2)),
+    (1, 2): ((0, 0), (1, 0), (1, -1), (0, 2), (1, 2)),
+    (2, 1): ((0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)),
+    (2, 3): ((0, 0), (1, 0), (1, 1), (0, -2), (1, -2)),
+    (3, 2): ((0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)),
+    (3, 0): ((0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)),
+    (0, 3): ((0, 0), (1, 0), (1, 1), (0, -2), (1, -2)),
+}
+I_KICKS = {
+    (0, 1): ((0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)),
+    (1, 0): ((0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)),
+    (1, 2): ((0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)),
+    (2, 1): ((0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)),
+    (2, 3): ((0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)),
+    (3, 2): ((0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)),
+    (3, 0): ((0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)),
+    (0, 3): ((0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)),
+}
+O_KICKS = {key: ((0, 0),) for key in JLSTZ_KICKS}
+
+
+class RotationState:
+    """One rotation of one piece, trimmed to its bounding box"""
+    __slots__ = ("shape", "masks", "cells", "bottoms", "width", "height", "box_x", "box_y", "pivot")
+
+    def __init__(self, box, pivot):
+        filled = [(x, y) for y, row in enumerate(box) for x, cell in enumerate(row) if cell]
+        self.box_x = min(x for x, _ in filled)
+        self.box_y = min(y for _, y in filled)
+        self.width = max(x for x, _ in filled) - self.box_x + 1
+        self.height = max(y for _, y in filled) - self.box_y + 1
+        self.shape = tuple(tuple(row[self.box_x:self.box_x + self.width])
+                           for row in box[self.box_y:self.box_y + self.height])
+        self.masks = shape_masks(self.shape)
+        self.cells = tuple((x - self.box_x, y - self.box_y) for x, y in filled)
+        # Lowest occupied row of each column, for Board.drop_distance
+        self.bottoms = tuple(max(y for x, y in self.cells if x == column) for column in range(self.width))
+        # Rotation centre relative to the trimmed shape (used for T-spin corners)
+        self.pivot = (pivot[0] - self.box_x, pivot[1] - self.box_y)
+
+
+def _build_states(shape):
+    """Place a spawn shape in its SRS box and generate the four clockwise rotations"""
+    size = max(len(shape), len(shape[0]))
+    row_offset = 1 if size == 4 else 0
+    box = [[0] * size for _ in range(size)]
+    for y, row in enumerate(shape):
+        for x, cell in enumerate(row):
+            box[y + row_offset][x] = cell
+    pivot = (size // 2, size // 2)
+    states = []
+    for _ in range(4):
+        states.append(RotationState(box, pivot))
+        box = [list(row) for row in zip(*box[::-1])]
+    return tuple(states)
+
+
+def _build_kicks(states, srs_kicks):
+    """Convert SRS kicks into offsets for the trimmed (top-left anchored) shapes"""
+    kicks = [[None] * 4 for _ in range(4)]
+    for (src, dst), tests in srs_kicks.items():
+        dx = states[dst].box_x - states[src].box_x
+        dy = states[dst].box_y - states[src].box_y
+        kicks[src][dst] = tuple((dx + kx, dy - ky) for kx, ky in tests)
+    return kicks
+
+
+# PIECES[shape_index][rotation] -> RotationState
+PIECES = tuple(_build_states(shape) for shape in SHAPES)
+
+# KICKS[shape_index][from_rotation][to_rotation] -> ((dx, dy), ...) in grid coordinates
+KICKS = tuple(
+    _build_kicks(states, I_KICKS if index == 0 else O_KICKS if index == 3 else JLSTZ_KICKS)
+    for index, states in enumerate(PIECES)
+)
@@ -0,0 +1,142 @@
+'''placements.py - Enumerate every reachable lock position for a piece'''
+from engine import LEFT, RIGHT, ROTATE, ROTATE_CCW, SOFT_DROP, HARD_DROP
+from pieces import KICKS, PIECES
+
+
+class Placement:
+    """A distinct final position and the inputs that reach it from the spawn.
+
+    ``path`` is a list of engine actions ending in HARD_DROP. SOFT_DROP in a
+    path means "drop to the floor without locking" (see apply_path).
+    """
+    __slots__ = ("x", "y", "rotation", "path")
+
+    def __init__(self, x, y, rotation, path):
+        self.x = x
+        self.y = y
+        self.rotation = rotation
+        self.path = path
+
+    def __repr__(self):
+        return f"Placement(x={self.x}, y={self.y}, rotation={self.rotation}, path={self.path})"
+
+
+def column_masks(grid):
+    """Return one bit mask per column, bit y set when (x, y) is occupied"""
+    return grid.columns[:]
+
+
+def free_rows(grid, shape_index, columns=None):
+    """free[rotation][x] is a bit mask of the rows y where the piece fits at (x, y)"""
+    columns = column_masks(grid) if columns is None else columns
+    free = []
+    for state in PIECES[shape_index]:
+        row_limit = (1 << (grid.height - state.height + 1)) - 1
+        per_x = []
+        for x in range(grid.width - state.width + 1):
+            blocked = 0
+            for cx, cy in state.cells:
+                blocked |= columns[x + cx] >> cy
+            per_x.append(~blocked & row_limit)
+        free.append(per_x)
+    return free
+
+
+def find_placements(grid, block):
+    """Breadth-first search of every lock position reachable by the block.
+
+    Moves are left, right, both rotations (with the same SRS kicks as
+    Block.rotate) and a soft drop to the floor. Results are deduplicated by
+    the cells the piece would occupy, so symmetric rotations that leave the
+    same board are reported once, with the shortest path found.
+    """
+    shape_index = block.shape_index
+    states = PIECES[shape_index]
+    kicks = KICKS[shape_index]
+    free = free_rows(grid, shape_index)
+    width = grid.width
+
+    # States are packed as rotation << 16 | x << 8 | y to keep the search on ints
+    rotation, x, y = block.rotation, block.x, block.y
+    if not (0 <= x < len(free[rotation]) and y >= 0 and free[rotation][x] >> y & 1):
+        return []
+    # Rotations that cannot change the piece (the O piece) are left out entirely
+    rotation_moves = [
+        [(action, target, kicks[rotation][target])
+         for action, target in ((ROTATE, (rotation + 1) % 4), (ROTATE_CCW, (rotation + 3) % 4))
+         if states[target].shape != states[rotation].shape or kicks[rotation][target][0] != (0, 0)]
+        for rotation in range(4)
+    ]
+
+    start = rotation << 16 | x << 8 | y
+    parents = {start: None}
+    queue = [start]
+    locks = []
+    for state in queue:
+        rotation, x, y = state >> 16, state >> 8 & 255, state & 255
+        column = free[rotation]
+        fits = column[x]
+        if not fits >> (y + 1) & 1:
+            locks.append(state)
+
+        if x and column[x - 1] >> y & 1:
+            target = state - 256
+            if target not in parents:
+                parents[target] = (state, LEFT)
+                queue.append(target)
+        if x + 1 < len(column) and column[x + 1] >> y & 1:
+            target = state + 256
+            if target not in parents:
+                parents[target] = (state, RIGHT)
+                queue.append(target)
+        for action, new_rotation, tests in rotation_moves[rotation]:
+            target_column = free[new_rotation]
+            for dx, dy in tests:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < len(target_column) and ny >= 0 and target_column[nx] >> ny & 1:
+                    target = new_rotation << 16 | nx << 8 | ny
+                    if target not in parents:
+                        parents[target] = (state, action)
+                        queue.append(target)
+                    break
+        below = fits >> y
+        drop = (~below & (below + 1)).bit_length() - 2
+        if drop > 0:
+            target = state + drop
+            if target not in parents:
+                parents[target] = (state, SOFT_DROP)
+                queue.append(target)
+
+    placements = []
+    seen_cells = set()
+    for state in locks:
+        rotation, x, y = state >> 16, state >> 8 & 255, state & 255
+        cells = 0
+        for dy, mask in enumerate(states[rotation].masks):
+            cells |= mask << (x + (y + dy) * width)
+        if cells in seen_cells:
+            continue
+        seen_cells.add(cells)
+        path = []
+        link = parents[state]
+        while link is not None:
+            state, action = link
+            path.append(action)
+            link = parents[state]
+        path.reverse()
+        if path and path[-1] == SOFT_DROP:
+            path.pop()
+        path.append(HARD_DROP)
+        placements.append(Placement(x, y, rotation, path))
+    return placements
+
+
+def apply_path(engine, path):
+    """Play a placement path on an engine.Engine, locking the piece at the end"""
+    for action in path:
+        if action == SOFT_DROP:
+            while engine.move_block(0, 1):
+                pass
+        else:
+            engine.press(action)
+            engine.release(action)
@@ -0,0 +1,115 @@
+'''profiler.py - Per-frame phase profiler with on-screen overlay and CSV export'''
+import csv
+import functools
+import time
+from collections import deque
+import pygame
+import fonts
+from stats import percentile
+from constants import *
+
+# Samples kept per phase for the rolling percentiles
+WINDOW = 600
+# How often the overlay text is rebuilt (ns)
+OVERLAY_REFRESH = 250_000_000
+OVERLAY_FONT = ("couriernew", 14, False)
+
+
+class FrameProfiler:
+    """Times the phases of each main loop iteration and the design.draw_* calls.
+
+    Timings are perf_counter_ns deltas kept in a rolling window per phase.
+    The profiler only exists when profiling was asked for: the main loop
+    skips it entirely otherwise, and the draw functions are only wrapped
+    by instrument(), so a disabled profiler costs nothing.
+    """
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.frame_start = self.last = 0
+        self.overlay_visible = False
+        self.overlay = None
+        self.overlay_time = 0
+        self.originals = []
+
+    def add(self, phase, elapsed):
+        samples = self.samples.get(phase)
+        if samples is None:
+            samples = self.samples[phase] = deque(maxlen=self.window)
+            self.counts[phase] = 0
+        samples.append(elapsed)
+        self.counts[phase] += 1
+
+    def start_frame(self):
+        self.frame_start = self.last = time.perf_counter_ns()
+
+    def mark(self, phase):
+        """Record the time since the previous mark as phase"""
+        now = time.perf_counter_ns()
+        self.add(phase, now - self.last)
+        self.last = now
+
+    def end_frame(self):
+        self.add("frame", time.perf_counter_ns() - self.frame_start)
+
+    def instrument(self, module, prefix="draw_"):
+        """Wrap every function of module whose name starts with prefix in a timer"""
+        for name, function in list(vars(module).items()):
+            if name.startswith(prefix) and callable(function):
+                self.originals.append((module, name, function))
+                setattr(module, name, self._timed(f"{module.__name__}.{name}", function))
+
+    def restore(self):
+        """Undo instrument()"""
+        for module, name, function in reversed(self.originals):
+            setattr(module, name, function)
+        self.originals.clear()
+
+    def _timed(self, phase, function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter_ns() - start)
+        return timed
+
+    def summary(self):
+        """Return (phase, count, mean, p50, p95, p99, max) rows in milliseconds"""
+        rows = []
+        for phase, samples in self.samples.items():
+            ordered = sorted(samples)
+            rows.append((phase, self.counts[phase], sum(ordered) / len(ordered) / 1e6,
+                         *(percentile(ordered, f) / 1e6 for f in (0.5, 0.95, 0.99)), ordered[-1] / 1e6))
+        return rows
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+        self.overlay = None
+
+    def draw_overlay(self, screen):
+        """Draw the rolling percentiles in the top left corner, rebuilding the text a few times a second"""
+        now = time.perf_counter_ns()
+        if self.overlay is None or now - self.overlay_time >= OVERLAY_REFRESH:
+            self.overlay_time = now
+            lines = [f"{'phase':<28}{'p50':>7}{'p95':>7}{'p99':>7}"]
+            lines += [f"{phase[-28:]:<28}{p50:7.2f}{p95:7.2f}{p99:7.2f}"
+                      for phase, count, mean, p50, p95, p99, peak in self.summary()]
+            texts = [fonts.render(OVERLAY_FONT, line, WHITE) for line in lines]
+            self.overlay = pygame.Surface((max(t.get_width() for t in texts) + 10,
+                                           sum(t.get_height() for t in texts) + 10), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 180))
+            y = 5
+            for text in texts:
+                self.overlay.blit(text, (5, y))
+                y += text.get_height()
+        screen.blit(self.overlay, (0, 0))
+
+    def write_csv(self, path):
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["phase", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+            for row in self.summary():
+                writer.writerow([row[0], row[1], *(f"{value:.4f}" for value in row[2:])])
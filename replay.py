@@ -0,0 +1,380 @@
+'''replay.py - Compact binary replay recording, playback and seeking'''
+import argparse
+import bisect
+import io
+import os
+import struct
+import time
+import engine
+import gameplay
+from constants import *
+
+# File layout: MAGIC, VERSION byte, then varints: seed, start level, DAS, ARR,
+# tick rate, followed by one varint per event (inputs, keyframes, END) and a
+# keyframe index trailer whose offset is stored in the last 4 bytes.
+MAGIC = b"TTRP"
+VERSION = 1
+# Event codes after the 4 bits of action << 1 | pressed
+END = 7 << 1
+KEYFRAME = 7 << 1 | 1
+# Pieces between keyframes
+KEYFRAME_INTERVAL = 25
+# Bytes read at a time while decoding
+CHUNK_SIZE = 4096
+
+# Boolean engine attributes packed into the keyframe flags
+FLAGS = ("back_to_back", "all_clear", "hold_used", "has_landed", "is_soft_dropping", "last_action_was_rotation")
+DOUBLE = struct.Struct("<d")
+
+
+def write_varint(buffer, value):
+    """Append a non-negative integer as a LEB128 varint"""
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+class ByteStream:
+    """Buffered reader of varints and raw bytes from a binary file"""
+    def __init__(self, file):
+        self.file = file
+        self.buffer = b""
+        self.pos = 0
+
+    def _fill(self):
+        chunk = self.file.read(CHUNK_SIZE)
+        if not chunk:
+            raise EOFError("Replay ends unexpectedly")
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def varint(self):
+        value = shift = 0
+        while True:
+            if self.pos == len(self.buffer):
+                self._fill()
+            byte = self.buffer[self.pos]
+            self.pos += 1
+            value |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return value
+            shift += 7
+
+    def read(self, size):
+        while len(self.buffer) - self.pos < size:
+            self._fill()
+        data = self.buffer[self.pos:self.pos + size]
+        self.pos += size
+        return data
+
+    def double(self):
+        return DOUBLE.unpack(self.read(DOUBLE.size))[0]
+
+    def tell(self):
+        return self.file.tell() - (len(self.buffer) - self.pos)
+
+
+def encode_keyframe(state):
+    """Serialise the engine state needed to resume a game exactly"""
+    data = bytearray()
+    block, hold = state.current_block, state.hold_block
+    flags = sum(1 << i for i, name in enumerate(FLAGS) if getattr(state, name))
+    held = sum(1 << action for action in state.held)
+    values = [state.score, state.combo_count, state.lines_cleared, state.level, state.pieces_placed,
+              state.bag_count, state.lock_resets, state.soft_drop_distance, flags, held,
+              block.shape_index << 2 | block.rotation, block.x, block.y,
+              0 if hold is None else 1 + (hold.shape_index << 2 | hold.rotation),
+              len(state.next_blocks), *(b.shape_index for b in state.next_blocks),
+              len(state.current_bag), *state.current_bag, *state.grid.rows]
+    for value in values:
+        write_varint(data, value)
+    # Cell colors of occupied cells only, two per byte
+    colors = [c for c in state.grid.colors if c]
+    colors.append(0)
+    data += bytes(colors[i] << 4 | colors[i + 1] for i in range(0, len(colors) - 1, 2))
+
+    # Timestamps are floats, and only the ones that can still matter are stored
+    times = [state.now, state.fall_time]
+    if state.has_landed:
+        times.append(state.lock_time)
+    timers = [timer for timer in (state.das_left, state.das_right) if timer.press_time is not None]
+    write_varint(data, (state.das_left.press_time is not None) | (state.das_right.press_time is not None) << 1)
+    for timer in timers:
+        write_varint(data, timer.shifts)
+        times.append(timer.press_time)
+    for value in times:
+        data += DOUBLE.pack(value)
+    return bytes(data)
+
+
+def decode_keyframe(data, state):
+    """Restore a keyframe made by encode_keyframe onto a freshly created engine"""
+    stream = ByteStream(io.BytesIO(data))
+    (state.score, state.combo_count, state.lines_cleared, state.level, state.pieces_placed,
+     state.bag_count, state.lock_resets, state.soft_drop_distance, flags, held,
+     shape, x, y, hold) = (stream.varint() for _ in range(14))
+    for i, name in enumerate(FLAGS):
+        setattr(state, name, bool(flags >> i & 1))
+    state.held = {action for action in range(7) if held >> action & 1}
+    state.current_block = gameplay.Block(shape >> 2, shape & 3)
+    state.current_block.x, state.current_block.y = x, y
+    state.hold_block = gameplay.Block((hold - 1) >> 2, (hold - 1) & 3) if hold else None
+    state.next_blocks = [gameplay.Block(stream.varint()) for _ in range(stream.varint())]
+    state.current_bag = [stream.varint() for _ in range(stream.varint())]
+    grid = state.grid
+    rows = [stream.varint() for _ in range(grid.height)]
+    cells = sum(bin(row).count("1") for row in rows)
+    packed = stream.read((cells + 1) // 2)
+    colors = iter([c for byte in packed for c in (byte >> 4, byte & 15)])
+    grid.load(rows, [next(colors) if row >> x & 1 else 0 for row in rows for x in range(grid.width)])
+
+    state.das_left = engine.InputTimer(state.das_delay, state.arr_delay)
+    state.das_right = engine.InputTimer(state.das_delay, state.arr_delay)
+    active = stream.varint()
+    timers = [timer for i, timer in enumerate((state.das_left, state.das_right)) if active >> i & 1]
+    for timer in timers:
+        timer.shifts = stream.varint()
+    state.now, state.fall_time = stream.double(), stream.double()
+    state.lock_time = stream.double() if state.has_landed else 0
+    for timer in timers:
+        timer.press_time = stream.double()
+    state.fall_speed = SOFT_DROP_SPEED if state.is_soft_dropping else gameplay.calculate_fall_speed(state.level)
+    return state
+
+
+class ReplayRecorder:
+    """Records the inputs of one game as it is played.
+
+    Each event is a single varint: the ticks since the previous event in
+    the high bits, then the action (3 bits) and whether it was a press
+    (1 bit). Events a few ticks apart take one or two bytes. Every
+    KEYFRAME_INTERVAL pieces a keyframe of the full engine state is
+    embedded in the stream so playback can seek without re-simulating
+    from the start.
+    """
+    def __init__(self, seed, start_level=1, das_delay=DAS_DELAY, arr_delay=ARR_DELAY, tick_rate=TICK_RATE,
+                 keyframe_interval=KEYFRAME_INTERVAL):
+        self.data = bytearray(MAGIC)
+        self.data.append(VERSION)
+        for value in (seed, start_level, das_delay, arr_delay, tick_rate):
+            write_varint(self.data, value)
+        self.last_tick = 0
+        self.keyframe_interval = keyframe_interval
+        self.next_keyframe = keyframe_interval
+        self.keyframes = []
+        self.finished = False
+
+    def record(self, tick, inputs):
+        """Record the (action, pressed) inputs applied on the given tick"""
+        for action, pressed in inputs:
+            write_varint(self.data, (tick - self.last_tick) << 4 | action << 1 | bool(pressed))
+            self.last_tick = tick
+
+    def checkpoint(self, tick, state):
+        """Embed a keyframe of state (before the given tick) once enough pieces were placed"""
+        if state.pieces_placed < self.next_keyframe or state.game_over:
+            return
+        self.next_keyframe = state.pieces_placed + self.keyframe_interval
+        write_varint(self.data, (tick - self.last_tick) << 4 | KEYFRAME)
+        self.last_tick = tick
+        self.keyframes.append((tick, len(self.data)))
+        payload = encode_keyframe(state)
+        write_varint(self.data, len(payload))
+        self.data += payload
+
+    def finish(self, ticks):
+        """Mark the game as ended after the given number of ticks"""
+        if not self.finished:
+            write_varint(self.data, (ticks - self.last_tick) << 4 | END)
+            self.last_tick = ticks
+            self.finished = True
+
+    def save(self, path=None):
+        """Write the replay (to REPLAY_DIR with a timestamped name by default) and return its path"""
+        if path is None:
+            os.makedirs(REPLAY_DIR, exist_ok=True)
+            path = os.path.join(REPLAY_DIR, time.strftime("%Y%m%d-%H%M%S") + ".ttr")
+        index = bytearray()
+        write_varint(index, self.last_tick)
+        write_varint(index, len(self.keyframes))
+        last_tick = last_offset = 0
+        for tick, offset in self.keyframes:
+            write_varint(index, tick - last_tick)
+            write_varint(index, offset - last_offset)
+            last_tick, last_offset = tick, offset
+        with open(path, "wb") as file:
+            file.write(self.data)
+            file.write(index)
+            file.write(len(self.data).to_bytes(4, "little"))
+        return path
+
+
+class Replay:
+    """A recorded game file. Events are decoded lazily from disk."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a replay file")
+            version = file.read(1)
+            if not version or version[0] != VERSION:
+                raise ValueError(f"Unsupported replay version in {path}")
+            stream = ByteStream(file)
+            self.seed, self.start_level, self.das_delay, self.arr_delay, self.tick_rate = \
+                (stream.varint() for _ in range(5))
+            self.events_offset = stream.tell()
+            self.length, self.keyframes = self._read_index(file)
+
+    def _read_index(self, file):
+        """Return (total ticks, [(tick, offset)]) from the trailer, scanning the events if it is missing"""
+        size = file.seek(0, os.SEEK_END)
+        if size >= self.events_offset + 4:
+            file.seek(-4, os.SEEK_END)
+            index_offset = int.from_bytes(file.read(4), "little")
+            if self.events_offset <= index_offset < size - 4:
+                file.seek(index_offset)
+                stream = ByteStream(file)
+                try:
+                    length, count = stream.varint(), stream.varint()
+                    keyframes = []
+                    tick = offset = 0
+                    for _ in range(count):
+                        tick += stream.varint()
+                        offset += stream.varint()
+                        keyframes.append((tick, offset))
+                    return length, keyframes
+                except EOFError:
+                    pass
+        keyframes = []
+        length = 0
+        for tick, action, pressed in self.events(keyframes=keyframes):
+            length = tick + 1
+        return length, keyframes
+
+    def events(self, offset=None, tick=0, keyframes=None):
+        """Yield (tick, action, pressed) from offset (the start by default) up to END.
+
+        Embedded keyframes are skipped; their (tick, offset) is appended to
+        keyframes when a list is given.
+        """
+        with open(self.path, "rb") as file:
+            file.seek(self.events_offset if offset is None else offset)
+            stream = ByteStream(file)
+            try:
+                if offset is not None:
+                    stream.read(stream.varint())
+                while True:
+                    value = stream.varint()
+                    tick += value >> 4
+                    code = value & 15
+                    if code == END:
+                        return
+                    if code == KEYFRAME:
+                        keyframe_offset = stream.tell()
+                        stream.read(stream.varint())
+                        if keyframes is not None:
+                            keyframes.append((tick, keyframe_offset))
+                        continue
+                    yield tick, code >> 1, bool(code & 1)
+            except EOFError:
+                return
+
+    def ticks(self, offset=None, tick=0):
+        """Yield the list of inputs for each tick, from tick (at offset) to the end"""
+        inputs = []
+        for event_tick, action, pressed in self.events(offset, tick):
+            while tick < event_tick:
+                yield inputs
+                tick, inputs = tick + 1, []
+            inputs.append((action, pressed))
+        while tick < self.length:
+            yield inputs
+            tick, inputs = tick + 1, []
+
+    def new_engine(self):
+        """Create an engine with the recorded seed and settings"""
+        return engine.Engine(self.start_level, seed=self.seed, das_delay=self.das_delay, arr_delay=self.arr_delay)
+
+    def load_keyframe(self, index):
+        """Return (engine, tick) restored from the keyframe at index"""
+        tick, offset = self.keyframes[index]
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            stream = ByteStream(file)
+            data = stream.read(stream.varint())
+        return decode_keyframe(data, self.new_engine()), tick
+
+    def play(self):
+        """Re-simulate the whole game and return the finished engine"""
+        state = self.new_engine()
+        state.run(self.ticks(), 1000 / self.tick_rate)
+        return state
+
+
+class ReplayPlayer:
+    """Steps a replay through engine.Engine, the same code that runs live games.
+
+    seek() restarts from the closest keyframe at or before the target, so
+    it costs at most one keyframe interval of simulation.
+    """
+    def __init__(self, replay):
+        self.replay = replay
+        self.tick_time = 1000 / replay.tick_rate
+        self.keyframe_ticks = [tick for tick, offset in replay.keyframes]
+        self.state = None
+        self.tick = -1
+        self.seek(0)
+
+    @property
+    def finished(self):
+        return self.tick >= self.replay.length or self.state.game_over
+
+    def seek(self, target):
+        """Move playback to the given tick"""
+        target = max(0, min(target, self.replay.length))
+        index = bisect.bisect_right(self.keyframe_ticks, target) - 1
+        start = self.keyframe_ticks[index] if index >= 0 else 0
+        if start <= self.tick <= target:
+            # Already between the keyframe and the target: just play forward
+            return self.advance(target - self.tick)
+        if index >= 0:
+            self.state, self.tick = self.replay.load_keyframe(index)
+            self.inputs = self.replay.ticks(self.replay.keyframes[index][1], self.tick)
+        else:
+            self.state, self.tick = self.replay.new_engine(), 0
+            self.inputs = self.replay.ticks()
+        return self.advance(target - self.tick)
+
+    def advance(self, count):
+        """Play up to count ticks and return how many were played"""
+        played = 0
+        while played < count and not self.finished:
+            inputs = next(self.inputs, None)
+            if inputs is None:
+                break
+            self.state.tick(self.tick_time, inputs)
+            self.tick += 1
+            played += 1
+        return played
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-simulate a recorded game and print its result")
+    parser.add_argument("path", help="replay file")
+    args = parser.parse_args(argv)
+
+    replay = Replay(args.path)
+    start = time.perf_counter()
+    state = replay.play()
+    elapsed = time.perf_counter() - start
+    print(f"{args.path}: {os.path.getsize(args.path)} bytes, seed {replay.seed}, level {replay.start_level}, "
+          f"DAS {replay.das_delay} ARR {replay.arr_delay} at {replay.tick_rate} Hz, "
+          f"{len(replay.keyframes)} keyframes")
+    print(f"score {state.score} lines {state.lines_cleared} level {state.level} pieces {state.pieces_placed} "
+          f"({state.now / 1000:.1f}s of play re-simulated in {elapsed:.2f}s)")
+    return state
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+'''selfplay.py - Multi-core self-play harness for benchmarking placement bots'''
+import argparse
+import multiprocessing
+import statistics
+import time
+import engine
+import placements
+from stats import percentile
+from pieces import PIECES
+from constants import *
+
+# Heuristic weights: aggregate height, completed lines, holes, bumpiness
+WEIGHTS = (-0.510066, 0.760666, -0.35663, -0.184483)
+
+
+def evaluate_board(grid, masks, x, y):
+    """Score the board that results from locking masks at (x, y)"""
+    board = grid.copy()
+    board.place(masks, x, y, 0)
+    lines = len(board.full_rows())
+    board.clear_rows(board.full_rows())
+
+    heights = [0] * board.width
+    holes = 0
+    for column, mask in enumerate(placements.column_masks(board)):
+        if mask:
+            top = (mask & -mask).bit_length() - 1
+            heights[column] = board.height - top
+            holes += heights[column] - bin(mask).count("1")
+    bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+    features = (sum(heights), lines, holes, bumpiness)
+    return sum(w * f for w, f in zip(WEIGHTS, features))
+
+
+def choose_placement(state):
+    """Pick the best reachable placement for the current block"""
+    block = state.current_block
+    best, best_value = None, None
+    for placement in placements.find_placements(state.grid, block):
+        masks = PIECES[block.shape_index][placement.rotation].masks
+        value = evaluate_board(state.grid, masks, placement.x, placement.y)
+        if best_value is None or value > best_value:
+            best, best_value = placement, value
+    return best
+
+
+def play_game(seed, level=1, max_pieces=1000):
+    """Play one seeded game with the heuristic bot and return its result"""
+    state = engine.Engine(level, seed=seed)
+    cause = "piece_limit"
+    while not state.game_over and state.pieces_placed < max_pieces:
+        placement = choose_placement(state)
+        if placement is None:
+            cause = "no_placement"
+            break
+        placements.apply_path(state, placement.path)
+    if state.game_over:
+        cause = state.top_out
+    return {
+        "seed": seed,
+        "score": state.score,
+        "lines": state.lines_cleared,
+        "level": state.level,
+        "pieces": state.pieces_placed,
+        "top_out": cause,
+    }
+
+
+def _play(args):
+    return play_game(*args)
+
+
+def print_summary(results, elapsed):
+    """Print throughput and score distribution for a finished run"""
+    pieces = sum(r["pieces"] for r in results)
+    scores = sorted(r["score"] for r in results)
+    causes = {}
+    for r in results:
+        causes[r["top_out"]] = causes.get(r["top_out"], 0) + 1
+
+    print(f"\n{len(results)} games, {pieces} pieces in {elapsed:.2f}s "
+          f"({pieces / elapsed if elapsed else 0:,.0f} pieces/s)")
+    print(f"score  mean {statistics.mean(scores):,.1f}  stdev {statistics.pstdev(scores):,.1f}")
+    print("       " + "  ".join(f"p{int(p * 100)} {percentile(scores, p):,}" for p in (0, 0.25, 0.5, 0.75, 0.95, 1)))
+    print(f"lines  mean {statistics.mean(r['lines'] for r in results):,.1f}  "
+          f"max level {max(r['level'] for r in results)}")
+    print("top out " + ", ".join(f"{cause}: {count}" for cause, count in sorted(causes.items())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run seeded self-play games across a process pool")
+    parser.add_argument("--games", type=int, default=100, help="number of games to play")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="worker processes (0 plays in this process)")
+    parser.add_argument("--level", type=int, default=1, choices=LEVEL_OPTIONS, help="starting level")
+    parser.add_argument("--max-pieces", type=int, default=1000, help="stop a game after this many pieces")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    jobs = [(seed, args.level, args.max_pieces) for seed in range(args.seed, args.seed + args.games)]
+    results = []
+    start = time.perf_counter()
+    pool = multiprocessing.Pool(args.workers) if args.workers else None
+    stream = pool.imap_unordered(_play, jobs) if pool else map(_play, jobs)
+    try:
+        for result in stream:
+            results.append(result)
+            if not args.quiet:
+                print("seed {seed}: score {score} lines {lines} level {level} "
+                      "pieces {pieces} ({top_out})".format(**result), flush=True)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda r: r["seed"])
+    print_summary(results, elapsed)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+'''startup.py - Startup phase timing report'''
+import importlib
+import time
+
+
+class StartupTimer:
+    """Wall time of each startup phase, counted from when this module was imported.
+
+    Import this before anything else so the first phase covers the imports.
+    """
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.phases = []
+
+    def mark(self, phase):
+        """Record the time since the previous mark as phase"""
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+    def load(self, phase, *modules):
+        """Import modules and record the time taken as phase"""
+        for name in modules:
+            importlib.import_module(name)
+        self.mark(phase)
+
+    def report(self):
+        lines = [f"{phase:<40}{ms:>9.1f} ms" for phase, ms in self.phases]
+        lines.append(f"{'total':<40}{(self.last - self.start) * 1000:>9.1f} ms")
+        return "\n".join(lines)
+
+timer = StartupTimer()
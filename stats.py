@@ -0,0 +1,6 @@
+'''stats.py - Summary statistics shared by the profiler, benchmarks and latency reports'''
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]